@@ -17,4 +17,20 @@ app.conf.beat_schedule = {
         'task': 'books.tasks.auto_complete_transactions',
         'schedule': crontab(minute=0, hour='*'),  # Run every hour
     },
+    'refund-expired-transactions': {
+        'task': 'books.tasks.refund_expired_transactions',
+        'schedule': crontab(minute='*/10'),
+    },
+    'reconcile-seller-totals-nightly': {
+        'task': 'books.tasks.reconcile_seller_totals',
+        'schedule': crontab(minute=30, hour=3),
+    },
+    'prune-expired-tokens': {
+        'task': 'users.tasks.prune_expired_tokens',
+        'schedule': crontab(minute=45, hour='*'),
+    },
+    'generate-missing-photo-variants': {
+        'task': 'media.tasks.generate_missing_photo_variants',
+        'schedule': crontab(minute='*/15'),
+    },
 }
\ No newline at end of file
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 from datetime import timedelta
 
@@ -9,6 +10,29 @@ PAYPAL_MODE = 'sandbox'  # Use 'live' for production
 PAYPAL_CLIENT_ID = 'AQ0yDqLrsHwYQQ7lyM-KXuB9RRxK7ihNH9Kx2t_umEOTchJSGB7IfyET0ZpJbvFa5QEbfPgC0DV_vNVh'  # Replace with your Sandbox Client ID
 PAYPAL_CLIENT_SECRET = 'EOg2f0f1gcQgMZG9gqfD1kIDgPqMr8bMwN4IBIUvXsG6HvwL1KXgxw4_VFhM-EAxWClv_jS0bbuZRy3E'  #
 
+# Payment gateway (books.payments); set the backend to
+# 'books.payments.FakePaymentBackend' to run the payment path without PayPal
+PAYMENT_GATEWAY_BACKEND = 'books.payments.PayPalBackend'
+PAYMENT_GATEWAY_CONNECT_TIMEOUT = 3.05  # Seconds
+PAYMENT_GATEWAY_READ_TIMEOUT = 20  # Seconds
+PAYMENT_GATEWAY_POOL_SIZE = 10  # Pooled HTTPS connections to PayPal
+PAYMENT_GATEWAY_FAILURE_THRESHOLD = 5  # Consecutive failures that open the circuit
+PAYMENT_GATEWAY_RECOVERY_SECONDS = 30  # How long the circuit stays open before a probe call
+PAYMENT_FAKE_LATENCY_SECONDS = 0  # Simulated round trip of the fake backend
+
+# Run payment gateway calls in Celery workers so they never hold a request worker;
+# False calls the gateway inside the request
+PAYMENT_GATEWAY_QUEUED = True
+PAYMENT_TASK_MAX_RETRIES = 3
+PAYMENT_TASK_RETRY_DELAY_SECONDS = 5  # Doubles after every retry
+
+# How long a buyer holds a listing between starting checkout and paying
+PAYMENT_RESERVATION_MINUTES = 30
+# Responses replayed for a repeated Idempotency-Key header
+PAYMENT_IDEMPOTENCY_CACHE_ALIAS = 'default'
+PAYMENT_IDEMPOTENCY_TTL_SECONDS = 60 * 60
+PAYMENT_IDEMPOTENCY_LOCK_SECONDS = 60  # Upper bound for a request holding its key
+
 # Platform commission percentage (e.g., 5%)
 PLATFORM_COMMISSION_PERCENT = 5.0
 
@@ -16,6 +40,19 @@ PLATFORM_COMMISSION_PERCENT = 5.0
 SELLER_CONFIRMATION_HOURS = 24
 BUYER_CONFIRMATION_DAYS = 7
 
+# Auto-completion sweeper: rows per UPDATE and wall-clock budget per run
+TRANSACTION_SWEEP_BATCH_SIZE = 1000
+TRANSACTION_SWEEP_TIME_BUDGET_SECONDS = 300
+
+# Refunds for transactions the seller did not confirm in time
+TRANSACTION_REFUND_BATCH_SIZE = 100
+TRANSACTION_REFUND_CONCURRENCY = 4  # Parallel PayPal calls per sweep
+TRANSACTION_REFUND_MAX_ATTEMPTS = 3  # Per sweep; transient failures are retried on the next sweep
+TRANSACTION_REFUND_MAX_TOTAL_ATTEMPTS = 15  # Across sweeps; then the refund is FAILED for an operator
+TRANSACTION_REFUND_BACKOFF_SECONDS = 2  # Doubles after every failed attempt
+TRANSACTION_REFUND_CLAIM_TIMEOUT_SECONDS = 15 * 60  # Reclaim rows left PROCESSING by a dead worker
+SELLER_DASHBOARD_MAX_DAYS = 366  # Longest period one dashboard request may cover
+
 # Celery Configuration
 CELERY_BROKER_URL = 'redis://localhost:6379/0'
 CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
@@ -23,6 +60,9 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
+# Seconds to keep retrying a broker connection; request paths that publish
+# tasks fall back to running them inline after this
+CELERY_BROKER_CONNECTION_TIMEOUT = 1
 
 DEBUG = True
 
@@ -31,6 +71,24 @@ ALLOWED_HOSTS = []
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Photo upload limits, enforced while the upload streams in
+PHOTO_UPLOAD_MAX_BYTES = 10 * 1024 * 1024
+PHOTO_UPLOAD_MAX_PIXELS = 40_000_000
+PHOTO_UPLOAD_HEADER_BYTES = 256 * 1024
+PHOTO_UPLOAD_ALLOWED_FORMATS = ('JPEG', 'PNG', 'WEBP', 'GIF')
+# Batch photo upload: files per request and concurrent storage writes
+PHOTO_BATCH_MAX_FILES = 20
+PHOTO_BATCH_WRITE_WORKERS = 4
+# Cache lifetime of content-addressed photo files (they never change)
+PHOTO_IMMUTABLE_CACHE_SECONDS = 365 * 24 * 60 * 60
+
+# Web-optimized photo variants generated after upload
+PHOTO_THUMBNAIL_SIZE = (320, 320)
+PHOTO_MEDIUM_SIZE = (960, 960)
+PHOTO_VARIANT_FORMAT = 'WEBP'
+PHOTO_VARIANT_QUALITY = 80
+PHOTO_VARIANT_MAX_ATTEMPTS = 3  # Originals that keep failing are left without variants
+
 INSTALLED_APPS = [
     'django.contrib.admin',
     'django.contrib.auth',
@@ -41,6 +99,7 @@ INSTALLED_APPS = [
     'corsheaders',
     'rest_framework',
     'rest_framework_simplejwt',
+    'rest_framework_simplejwt.token_blacklist',
     'users',
     'books',
     'media',
@@ -92,9 +151,28 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # A file rather than shared-cache memory, where concurrent writers in the
+        # threaded tests fail with "table is locked" instead of waiting their turn
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
+# Password hashing. Set PASSWORD_HASH_UPGRADE=1 to make the tuned scrypt hasher
+# the default: existing PBKDF2 hashes are rehashed on each user's next login
+PASSWORD_SCRYPT_WORK_FACTOR = 2 ** 15
+PASSWORD_SCRYPT_BLOCK_SIZE = 8
+PASSWORD_SCRYPT_PARALLELISM = 1
+PASSWORD_HASH_UPGRADE = os.environ.get('PASSWORD_HASH_UPGRADE') == '1'
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'users.hashers.TunedScryptPasswordHasher',
+]
+if PASSWORD_HASH_UPGRADE:
+    PASSWORD_HASHERS.insert(0, PASSWORD_HASHERS.pop())
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -114,7 +192,7 @@ AUTH_USER_MODEL = 'users.CustomUser'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -128,5 +206,62 @@ SIMPLE_JWT = {
     'BLACKLIST_AFTER_ROTATION': True,
 
     'AUTH_HEADER_TYPES': ('Bearer',),
+    'TOKEN_REFRESH_SERIALIZER': 'users.serializers.CachedBlacklistTokenRefreshSerializer',
 }
 
+# Expired refresh tokens are deleted in chunks by users.tasks.prune_expired_tokens
+TOKEN_PRUNE_BATCH_SIZE = 1000
+TOKEN_PRUNE_TIME_BUDGET_SECONDS = 300
+
+
+# Rows per INSERT/transaction when bulk importing listings
+LISTING_IMPORT_BATCH_SIZE = 500
+# Rows fetched per round trip by the streaming catalog export
+CATALOG_EXPORT_CHUNK_SIZE = 2000
+
+# Cache Configuration
+# Set CACHE_REDIS_URL (e.g. 'redis://localhost:6379/1') to share caches between workers
+CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL')
+if CACHE_REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_REDIS_URL,
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        },
+    }
+
+# Anonymous catalog responses, invalidated by bumping a version counter on writes
+CATALOG_CACHE_ALIAS = 'default'
+CATALOG_CACHE_SECONDS = 300
+# How long catalog row counts are reused by cursor pagination (seconds)
+CATALOG_COUNT_CACHE_SECONDS = 60
+# How long facet counts are reused for the same filter state (seconds)
+CATALOG_FACETS_CACHE_SECONDS = 30
+
+# Users resolved by CachedJWTAuthentication: the per-process copy may lag a
+# change made through another process by up to USER_CACHE_LOCAL_SECONDS. The
+# second tier in USER_CACHE_ALIAS is only used when all processes share it
+USER_CACHE_ALIAS = 'default'
+USER_CACHE_SHARED = bool(CACHE_REDIS_URL)
+USER_CACHE_SECONDS = 300
+USER_CACHE_LOCAL_SECONDS = 5
+USER_CACHE_LOCAL_MAX_ENTRIES = 10000
+
+# Refresh token blacklist verdicts (see users.tokens). A cached "not blacklisted"
+# can only be trusted when all processes share the cache
+TOKEN_BLACKLIST_CACHE_ALIAS = 'default'
+TOKEN_BLACKLIST_CACHE_TRUSTED = bool(CACHE_REDIS_URL)
+
+# Sliding-window login limits as (attempts, window seconds): every checked
+# attempt counts per client IP, only failed ones per email
+LOGIN_THROTTLE_ENABLED = True
+LOGIN_THROTTLE_CACHE_ALIAS = 'default'
+LOGIN_THROTTLE_IP_RATE = (30, 5 * 60)
+LOGIN_THROTTLE_EMAIL_RATE = (10, 15 * 60)
@@ -2,6 +2,7 @@ from django.contrib import admin  # Добавь этот импорт
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from media.views import serve_media
 
 
 urlpatterns = [
@@ -13,4 +14,4 @@ urlpatterns = [
 ]
 
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+    urlpatterns += static(settings.MEDIA_URL, view=serve_media, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
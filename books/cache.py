@@ -0,0 +1,92 @@
+# books/cache.py
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .search import tokenize
+
+VERSION_KEY = 'catalog:version'
+HITS_KEY = 'catalog:stats:hits'
+MISSES_KEY = 'catalog:stats:misses'
+
+
+def get_cache():
+    return caches[settings.CATALOG_CACHE_ALIAS]
+
+
+def _incr(cache, key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        return cache.incr(key)
+
+
+def catalog_version():
+    cache = get_cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Start from the clock so a lost counter never revives old entries
+        cache.add(VERSION_KEY, int(time.time() * 1000), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    cache = get_cache()
+    try:
+        return cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, int(time.time() * 1000), timeout=None)
+        return cache.get(VERSION_KEY)
+
+
+def normalize_params(query_params):
+    normalized = {}
+    for name in query_params:
+        values = [value.strip() for value in query_params.getlist(name) if value.strip()]
+        if not values:
+            continue
+        if name == 'search':
+            values = [' '.join(tokenize(value)) for value in values]
+        elif name in ('city', 'category'):
+            values = [value.casefold() for value in values]
+        elif name == 'genre_id':
+            ids = {int(part) for value in values for part in value.split(',') if part.strip().isdigit()}
+            values = [','.join(str(genre_id) for genre_id in sorted(ids))]
+        normalized[name] = sorted(values)
+    return sorted(normalized.items())
+
+
+def catalog_cache_key(prefix, request):
+    signature = repr((request.get_host(), request.scheme, normalize_params(request.query_params)))
+    digest = hashlib.sha1(signature.encode()).hexdigest()
+    return f'catalog:{prefix}:v{catalog_version()}:{digest}'
+
+
+def get_cached(key):
+    cache = get_cache()
+    data = cache.get(key)
+    _incr(cache, MISSES_KEY if data is None else HITS_KEY)
+    return data
+
+
+def set_cached(key, data, timeout=None):
+    if timeout is None:
+        timeout = settings.CATALOG_CACHE_SECONDS
+    get_cache().set(key, data, timeout)
+
+
+def cache_stats():
+    cache = get_cache()
+    hits = cache.get(HITS_KEY) or 0
+    misses = cache.get(MISSES_KEY) or 0
+    total = hits + misses
+    return {
+        'version': catalog_version(),
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 4) if total else None,
+    }
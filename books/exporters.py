@@ -0,0 +1,81 @@
+# books/exporters.py
+import csv
+import json
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .filters import filter_catalog
+
+EXPORT_VALUES = (
+    'id', 'title', 'author', 'description', 'price', 'condition', 'is_sold',
+    'category__name', 'genre__name', 'user_id', 'user__region', 'photo__image',
+    'created_at', 'updated_at',
+)
+
+EXPORT_COLUMNS = (
+    'id', 'title', 'author', 'description', 'price', 'condition', 'is_sold',
+    'category', 'genre', 'seller_id', 'location', 'photo', 'created_at', 'updated_at',
+)
+
+EXPORT_FORMATS = ('ndjson', 'csv')
+
+
+def export_queryset(queryset, params, updated_since=None):
+    queryset = filter_catalog(queryset, params)
+    if updated_since is not None:
+        queryset = queryset.filter(updated_at__gte=updated_since)
+    # Ordered by update time so incremental consumers can checkpoint on it
+    return queryset.order_by('updated_at', 'id')
+
+
+def export_rows(queryset, request=None):
+    rows = queryset.values(*EXPORT_VALUES).iterator(chunk_size=settings.CATALOG_EXPORT_CHUNK_SIZE)
+    for row in rows:
+        photo = row['photo__image']
+        if photo:
+            photo = default_storage.url(photo)
+            if request is not None:
+                photo = request.build_absolute_uri(photo)
+        yield {
+            'id': row['id'],
+            'title': row['title'],
+            'author': row['author'],
+            'description': row['description'],
+            'price': row['price'],
+            'condition': row['condition'],
+            'is_sold': row['is_sold'],
+            'category': row['category__name'],
+            'genre': row['genre__name'],
+            'seller_id': row['user_id'],
+            'location': row['user__region'],
+            'photo': photo or None,
+            'created_at': row['created_at'],
+            'updated_at': row['updated_at'],
+        }
+
+
+def ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        yield writer.writerow([
+            value.isoformat() if hasattr(value, 'isoformat') else value
+            for value in (row[column] for column in EXPORT_COLUMNS)
+        ])
+
+
+def render_export(rows, export_format):
+    if export_format == 'csv':
+        return csv_lines(rows)
+    return ndjson_lines(rows)
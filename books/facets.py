@@ -0,0 +1,62 @@
+# books/facets.py
+from django.db.models import Count, Min
+
+from .filters import filter_catalog
+from .models import BookListing
+
+
+def catalog_facets(queryset, params):
+    """Per-value counts for every catalog filter in the current filter state.
+
+    Each facet ignores its own filter, so the sidebar keeps showing the
+    alternatives of a value that is already selected.
+    """
+    conditions = dict(BookListing.CONDITION_CHOICES)
+
+    categories = (
+        filter_catalog(queryset, params, exclude=('category',))
+        .filter(category__isnull=False)
+        .values('category_id', 'category__name')
+        .annotate(count=Count('id'))
+        .order_by('category__name')
+    )
+    genres = (
+        filter_catalog(queryset, params, exclude=('genre_id',))
+        .filter(genre__isnull=False)
+        .values('genre_id', 'genre__name')
+        .annotate(count=Count('id'))
+        .order_by('genre__name')
+    )
+    condition_counts = (
+        filter_catalog(queryset, params, exclude=('condition',))
+        .values('condition')
+        .annotate(count=Count('id'))
+        .order_by('condition')
+    )
+    cities = (
+        filter_catalog(queryset, params, exclude=('city',))
+        .exclude(seller_region='')
+        .values('seller_region')
+        .annotate(count=Count('id'), name=Min('user__region'))
+        .order_by('seller_region')
+    )
+
+    return {
+        'categories': [
+            {'id': row['category_id'], 'name': row['category__name'], 'count': row['count']}
+            for row in categories
+        ],
+        'genres': [
+            {'id': row['genre_id'], 'name': row['genre__name'], 'count': row['count']}
+            for row in genres
+        ],
+        'conditions': [
+            {'value': row['condition'], 'name': conditions.get(row['condition'], row['condition']),
+             'count': row['count']}
+            for row in condition_counts
+        ],
+        'cities': [
+            {'value': row['seller_region'], 'name': row['name'], 'count': row['count']}
+            for row in cities
+        ],
+    }
@@ -0,0 +1,89 @@
+# books/filters.py
+from datetime import datetime, time
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Transaction, lookup_key
+from .search import search_listings
+
+CATALOG_FILTERS = ('search', 'city', 'has_photo', 'condition', 'category', 'genre_id')
+TRANSACTION_STATUSES = {status for status, _ in Transaction.STATUS_CHOICES}
+
+
+def parse_genre_ids(value):
+    return [int(part.strip()) for part in value.split(',') if part.strip().isdigit()]
+
+
+def parse_moment(value):
+    """Accept an ISO datetime or a plain date; return None if unparsable."""
+    try:
+        moment = parse_datetime(value)
+        if moment is None:
+            day = parse_date(value)
+            if day is None:
+                return None
+            moment = datetime.combine(day, time.min)
+    except ValueError:
+        # Well formed but not a real date, e.g. 2024-02-30
+        return None
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def filter_catalog(queryset, params, exclude=()):
+    """Apply the catalog query parameters to a BookListing queryset.
+
+    ``exclude`` names filters to skip, which facet counts use to count the
+    alternatives of a filter that is already selected.
+    """
+    search_query = params.get('search')
+    if search_query and 'search' not in exclude:
+        queryset = search_listings(queryset, search_query)
+
+    city = params.get('city')
+    if city and 'city' not in exclude:
+        queryset = queryset.filter(seller_region=lookup_key(city))
+
+    has_photo = params.get('has_photo')
+    if has_photo == 'true' and 'has_photo' not in exclude:
+        queryset = queryset.exclude(photo=None)
+
+    condition = params.get('condition')
+    if condition and 'condition' not in exclude:
+        queryset = queryset.filter(condition=condition)
+
+    category = params.get('category')
+    if category and 'category' not in exclude:
+        queryset = queryset.filter(category__name_key=lookup_key(category))
+
+    genre_ids = params.get('genre_id')
+    if genre_ids and 'genre_id' not in exclude:
+        id_list = parse_genre_ids(genre_ids)
+        if id_list:
+            queryset = queryset.filter(genre__id__in=id_list)
+
+    return queryset
+
+
+def filter_transactions(queryset, params):
+    """Apply the ``status``, ``created_after`` and ``created_before`` history filters.
+
+    ``status`` takes one or more comma-separated statuses. Raises ValueError
+    with a user-facing message for invalid values.
+    """
+    statuses = {part.strip().upper() for value in params.getlist('status') for part in value.split(',') if part.strip()}
+    if statuses:
+        if not statuses <= TRANSACTION_STATUSES:
+            raise ValueError("Неверный статус")
+        queryset = queryset.filter(status__in=statuses)
+
+    for name, lookup in (('created_after', 'created_at__gte'), ('created_before', 'created_at__lt')):
+        value = params.get(name)
+        if value:
+            moment = parse_moment(value)
+            if moment is None:
+                raise ValueError(f"Неверный формат {name}")
+            queryset = queryset.filter(**{lookup: moment})
+    return queryset
@@ -0,0 +1,56 @@
+# books/idempotency.py
+import functools
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.response import Response
+
+IN_PROGRESS = 'in-progress'
+
+
+def get_store():
+    return caches[settings.PAYMENT_IDEMPOTENCY_CACHE_ALIAS]
+
+
+def idempotency_cache_key(request, key):
+    digest = hashlib.sha256(f'{request.user.pk}:{request.path}:{key}'.encode()).hexdigest()
+    return f'payments:idempotency:{digest}'
+
+
+def idempotent(view_method):
+    """Replay the first response for a repeated ``Idempotency-Key`` header.
+
+    The key is scoped to the user and the path. A second request arriving
+    while the first is still running gets 409 instead of running again.
+    Server errors are not stored, so the client may retry with the same key.
+    """
+    @functools.wraps(view_method)
+    def wrapper(view, request, *args, **kwargs):
+        key = request.headers.get('Idempotency-Key', '').strip()
+        if not key:
+            return view_method(view, request, *args, **kwargs)
+
+        store = get_store()
+        cache_key = idempotency_cache_key(request, key)
+        if not store.add(cache_key, IN_PROGRESS, settings.PAYMENT_IDEMPOTENCY_LOCK_SECONDS):
+            stored = store.get(cache_key)
+            if stored is None or stored == IN_PROGRESS:
+                return Response({"error": "Запрос с этим ключом уже обрабатывается"}, status=status.HTTP_409_CONFLICT)
+            return Response(stored['data'], status=stored['status'], headers={'Idempotent-Replayed': 'true'})
+
+        try:
+            response = view_method(view, request, *args, **kwargs)
+        except Exception:
+            store.delete(cache_key)
+            raise
+        if response.status_code >= 500:
+            store.delete(cache_key)
+        else:
+            store.set(
+                cache_key, {'status': response.status_code, 'data': response.data},
+                settings.PAYMENT_IDEMPOTENCY_TTL_SECONDS,
+            )
+        return response
+    return wrapper
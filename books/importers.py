@@ -0,0 +1,157 @@
+# books/importers.py
+import csv
+import io
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import transaction
+
+from . import search
+from .cache import bump_catalog_version
+from .models import BookListing, Category, Genre, lookup_key
+
+CONDITIONS = dict(BookListing.CONDITION_CHOICES)
+MAX_REPORTED_ERRORS = 1000
+
+
+class RowError(ValueError):
+    pass
+
+
+# Raised while reading a file that is not valid UTF-8 or not valid CSV
+READ_ERRORS = (UnicodeDecodeError, csv.Error)
+
+
+def read_rows(stream, file_format):
+    """Yield ``(line_number, dict)`` from a binary CSV or JSONL stream, one row at a time."""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if file_format == 'csv':
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row
+    elif file_format == 'jsonl':
+        for line_number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                yield line_number, None
+                continue
+            yield line_number, row
+    else:
+        raise ValueError(f"Unsupported format: {file_format}")
+
+
+class ListingImporter:
+    """Validates rows against the BookListing fields and inserts them in batches.
+
+    Category and genre names are resolved through maps loaded once up front,
+    so validation does not touch the database. Bad rows are reported and
+    skipped; the rest of the file is still imported.
+    """
+
+    def __init__(self, user, batch_size=None):
+        self.user = user
+        self.batch_size = batch_size or settings.LISTING_IMPORT_BATCH_SIZE
+        self.seller_region = lookup_key(user.region)
+        self.categories = {
+            category.name_key: category.id for category in Category.objects.only('id', 'name_key')
+        }
+        self.genres = {}
+        for genre in Genre.objects.only('id', 'name').order_by('id'):
+            self.genres.setdefault(lookup_key(genre.name), genre.id)
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+
+    def clean_text(self, row, name, max_length=None, required=True, default=''):
+        value = row.get(name)
+        value = '' if value is None else str(value).strip()
+        if not value:
+            if required:
+                raise RowError(f"{name}: обязательное поле")
+            return default
+        if max_length and len(value) > max_length:
+            raise RowError(f"{name}: не более {max_length} символов")
+        return value
+
+    def clean_price(self, row):
+        try:
+            price = Decimal(str(row.get('price', '')).strip().replace(',', '.'))
+        except InvalidOperation:
+            raise RowError("price: неверное число")
+        if not price.is_finite() or price < 0:
+            raise RowError("price: неверное число")
+        # Checked before quantize(), which raises InvalidOperation on huge values
+        if price.adjusted() >= 8:
+            raise RowError("price: слишком большое значение")
+        return price.quantize(Decimal('0.01'))
+
+    def clean_lookup(self, row, name, mapping):
+        value = row.get(name)
+        if value is None or not str(value).strip():
+            return None
+        key = lookup_key(str(value))
+        if key not in mapping:
+            raise RowError(f"{name}: '{value}' не найдено")
+        return mapping[key]
+
+    def build_listing(self, row):
+        if not isinstance(row, dict):
+            raise RowError("неверный формат строки")
+        condition = self.clean_text(row, 'condition', required=False, default='new')
+        if condition not in CONDITIONS:
+            raise RowError(f"condition: допустимые значения {', '.join(CONDITIONS)}")
+        return BookListing(
+            user=self.user,
+            seller_region=self.seller_region,
+            title=self.clean_text(row, 'title', max_length=255),
+            description=self.clean_text(row, 'description'),
+            author=self.clean_text(row, 'author', max_length=255, required=False, default='Невідомий автор'),
+            price=self.clean_price(row),
+            condition=condition,
+            category_id=self.clean_lookup(row, 'category', self.categories),
+            genre_id=self.clean_lookup(row, 'genre', self.genres),
+        )
+
+    def flush(self, batch):
+        if not batch:
+            return
+        with transaction.atomic():
+            listings = BookListing.objects.bulk_create(batch)
+            search.index_listings(listings)
+        self.created += len(listings)
+
+    def run(self, rows):
+        """Import the rows and return the report.
+
+        Errors reading the file itself (bad encoding, broken CSV) propagate;
+        batches flushed before them stay imported and ``report()`` says how many.
+        """
+        batch = []
+        try:
+            for line_number, row in rows:
+                try:
+                    batch.append(self.build_listing(row))
+                except RowError as error:
+                    self.failed += 1
+                    if len(self.errors) < MAX_REPORTED_ERRORS:
+                        self.errors.append({'line': line_number, 'error': str(error)})
+                    continue
+                if len(batch) >= self.batch_size:
+                    self.flush(batch)
+                    batch = []
+            self.flush(batch)
+        finally:
+            if self.created:
+                bump_catalog_version()
+        return self.report()
+
+    def report(self):
+        return {'created': self.created, 'failed': self.failed, 'errors': self.errors}
+
+
+def import_listings(stream, file_format, user, batch_size=None):
+    return ListingImporter(user, batch_size=batch_size).run(read_rows(stream, file_format))
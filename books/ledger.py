@@ -0,0 +1,189 @@
+# books/ledger.py
+"""Seller earnings ledger kept in SellerDailyTotals.
+
+Every transaction creation, status transition and deletion applies a small
+delta to the affected (seller, day, status) rows, so the dashboard reads a
+handful of rows per day instead of summing the seller's transactions. A
+nightly reconciliation recomputes each seller's rows from Transaction to
+repair drift, e.g. from status edits in the admin.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import TRANSITION_VALUES, SellerDailyTotals, Transaction
+
+# Statuses in which the buyer's money is held or paid out
+SOLD_STATUSES = ('PAID', 'SELLER_CONFIRMED', 'BUYER_CONFIRMED', 'COMPLETED', 'DISPUTED')
+TOTAL_FIELDS = ('count', 'gross', 'commission', 'net')
+
+
+def _zero():
+    return [0, Decimal('0'), Decimal('0'), Decimal('0')]
+
+
+def _add(deltas, row, status, sign):
+    key = (row['seller_id'], timezone.localdate(row['created_at']), status)
+    delta = deltas[key]
+    delta[0] += sign
+    delta[1] += sign * row['amount']
+    delta[2] += sign * row['platform_commission']
+    delta[3] += sign * row['seller_amount']
+
+
+def apply_deltas(deltas):
+    for (seller_id, day, status), (count, gross, commission, net) in deltas.items():
+        if not count:
+            continue
+        lookup = {'seller_id': seller_id, 'day': day, 'status': status}
+        changes = {
+            'count': F('count') + count,
+            'gross': F('gross') + gross,
+            'commission': F('commission') + commission,
+            'net': F('net') + net,
+        }
+        if SellerDailyTotals.objects.filter(**lookup).update(**changes) or count < 0:
+            # A missing row has nothing to subtract from; reconciliation repairs it
+            continue
+        try:
+            with transaction.atomic():
+                SellerDailyTotals.objects.create(count=count, gross=gross, commission=commission, net=net, **lookup)
+        except IntegrityError:
+            # Created concurrently
+            SellerDailyTotals.objects.filter(**lookup).update(**changes)
+
+
+def record_transition(rows, target):
+    """Move the given transactions from their previous status to ``target``."""
+    deltas = defaultdict(_zero)
+    for row in rows:
+        _add(deltas, row, row['status'], -1)
+        _add(deltas, row, target, 1)
+    apply_deltas(deltas)
+
+
+def record_added(row):
+    deltas = defaultdict(_zero)
+    _add(deltas, row, row['status'], 1)
+    apply_deltas(deltas)
+
+
+def record_removed(row):
+    deltas = defaultdict(_zero)
+    _add(deltas, row, row['status'], -1)
+    apply_deltas(deltas)
+
+
+def transaction_row(instance):
+    return {name: getattr(instance, name) for name in TRANSITION_VALUES}
+
+
+def computed_totals(queryset=None):
+    """Yield SellerDailyTotals rebuilt from transactions, one per (seller, day, status)."""
+    queryset = Transaction.objects.all() if queryset is None else queryset
+    grouped = (
+        queryset.annotate(day=TruncDate('created_at'))
+        .values('seller_id', 'day', 'status')
+        .annotate(
+            total_count=Count('id'),
+            total_gross=Sum('amount'),
+            total_commission=Sum('platform_commission'),
+            total_net=Sum('seller_amount'),
+        )
+        .order_by()
+    )
+    for row in grouped.iterator():
+        yield SellerDailyTotals(
+            seller_id=row['seller_id'], day=row['day'], status=row['status'],
+            count=row['total_count'], gross=row['total_gross'],
+            commission=row['total_commission'], net=row['total_net'],
+        )
+
+
+def _reconcile_seller(seller_id):
+    """Bring one seller's rows in line with their transactions; returns the rows changed.
+
+    The seller's rows stay locked while their totals are recomputed, so a
+    transition committing meanwhile waits and applies its delta on top of the
+    repaired row instead of to one that is being replaced.
+    """
+    changed = 0
+    with transaction.atomic():
+        existing = {
+            (row.day, row.status): row
+            for row in SellerDailyTotals.objects.select_for_update().filter(seller_id=seller_id)
+        }
+        created = []
+        for totals in computed_totals(Transaction.objects.filter(seller_id=seller_id)):
+            row = existing.pop((totals.day, totals.status), None)
+            if row is None:
+                created.append(totals)
+            elif any(getattr(row, name) != getattr(totals, name) for name in TOTAL_FIELDS):
+                SellerDailyTotals.objects.filter(id=row.id).update(
+                    **{name: getattr(totals, name) for name in TOTAL_FIELDS}
+                )
+                changed += 1
+        # A transition may have created one of these rows since the lock was taken;
+        # the IntegrityError rolls this seller back for a retry
+        SellerDailyTotals.objects.bulk_create(created)
+        stale = [row.id for row in existing.values()]
+        if stale:
+            SellerDailyTotals.objects.filter(id__in=stale).delete()
+    return changed + len(created) + len(stale)
+
+
+def reconcile(max_attempts=3):
+    """Repair SellerDailyTotals from Transaction, one seller at a time; returns the rows changed."""
+    seller_ids = set(Transaction.objects.values_list('seller_id', flat=True).distinct())
+    seller_ids.update(SellerDailyTotals.objects.values_list('seller_id', flat=True).distinct())
+    changed = 0
+    for seller_id in sorted(seller_ids):
+        for attempt in range(1, max_attempts + 1):
+            try:
+                changed += _reconcile_seller(seller_id)
+                break
+            except IntegrityError:
+                if attempt == max_attempts:
+                    raise
+    return changed
+
+
+def seller_dashboard(seller, date_from, date_to):
+    """Totals of a seller's transactions created between two dates, inclusive."""
+    rows = SellerDailyTotals.objects.filter(seller=seller, day__gte=date_from, day__lte=date_to).values(
+        'day', 'status', *TOTAL_FIELDS
+    )
+    by_status = {status: dict(zip(TOTAL_FIELDS, _zero())) for status, _ in Transaction.STATUS_CHOICES}
+    daily = {}
+    for row in rows:
+        totals = by_status[row['status']]
+        for name in TOTAL_FIELDS:
+            totals[name] += row[name]
+        if row['status'] in SOLD_STATUSES:
+            day = daily.setdefault(row['day'], dict(zip(TOTAL_FIELDS, _zero())))
+            for name in TOTAL_FIELDS:
+                day[name] += row[name]
+
+    sold = dict(zip(TOTAL_FIELDS, _zero()))
+    for status in SOLD_STATUSES:
+        for name in TOTAL_FIELDS:
+            sold[name] += by_status[status][name]
+    return {
+        'date_from': date_from,
+        'date_to': date_to,
+        'sales': sold,
+        'paid_out_net': by_status['COMPLETED']['net'],
+        'pending_net': sold['net'] - by_status['COMPLETED']['net'],
+        'by_status': by_status,
+        'daily': [dict(day=day, **daily[day]) for day in sorted(daily)],
+    }
+
+
+def default_period():
+    today = timezone.localdate()
+    return today - timedelta(days=29), today
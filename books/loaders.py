@@ -0,0 +1,29 @@
+# books/loaders.py
+from django.db.models import Prefetch
+
+from .models import Favorite, Transaction
+
+
+def with_listing_relations(queryset, prefix=''):
+    """Load everything BookListingSerializer/BookDetailSerializer touch up front.
+
+    ``prefix`` lets the same loader be used from models that point at a
+    listing, e.g. ``prefix='book_listing__'`` for favorites.
+    """
+    return queryset.select_related(
+        f'{prefix}user__avatar', f'{prefix}photo', f'{prefix}category', f'{prefix}genre'
+    ).prefetch_related(
+        Prefetch(
+            f'{prefix}transactions',
+            queryset=Transaction.objects.select_related('buyer__avatar', 'seller__avatar'),
+        )
+    )
+
+
+def favorited_ids(user, listing_ids):
+    if user is None or not user.is_authenticated or not listing_ids:
+        return set()
+    return set(
+        Favorite.objects.filter(user=user, book_listing_id__in=listing_ids)
+        .values_list('book_listing_id', flat=True)
+    )
@@ -0,0 +1,79 @@
+import time
+from decimal import Decimal
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from books.loaders import with_listing_relations
+from books.models import BookListing, Category, Genre
+from books.projections import LISTING_VALUES, render_listings
+from books.serializers import BookListingSerializer
+from users.models import CustomUser
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Compare BookListingSerializer with the values() projection on one catalog page"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        items = options['items']
+        repeat = options['repeat']
+        try:
+            with transaction.atomic():
+                self.ensure_listings(items)
+                self.run(items, repeat)
+                # Never keep the generated rows
+                raise Rollback
+        except Rollback:
+            pass
+
+    def ensure_listings(self, items):
+        missing = items - BookListing.objects.count()
+        if missing <= 0:
+            return
+        # Reuse the seller if a dev database already has one
+        seller = CustomUser.objects.filter(email='bench-seller@example.com').first()
+        if seller is None:
+            seller = CustomUser.objects.create_user(
+                email='bench-seller@example.com', password=None, first_name='Bench', last_name='Seller',
+                region='Київська область',
+            )
+        category, _ = Category.objects.get_or_create(name='Bench category')
+        genre = Genre.objects.create(name='Bench genre')
+        BookListing.objects.bulk_create([
+            BookListing(
+                user=seller, title=f'Bench book {i}', description='Lorem ipsum ' * 20,
+                price=Decimal('100.00') + i, category=category, genre=genre,
+            )
+            for i in range(missing)
+        ])
+
+    def run(self, items, repeat):
+        request = Request(APIRequestFactory().get('/api/books/book-listings/all/'))
+        request.user = AnonymousUser()
+        queryset = BookListing.objects.order_by('-created_at', '-id')
+
+        def serializer_page():
+            page = list(with_listing_relations(queryset)[:items])
+            return BookListingSerializer(page, many=True, context={'request': request}).data
+
+        def projection_page():
+            return render_listings(queryset.values(*LISTING_VALUES)[:items], request)
+
+        for label, func in (('BookListingSerializer', serializer_page), ('values() projection', projection_page)):
+            func()  # warm up
+            started = time.perf_counter()
+            for _ in range(repeat):
+                func()
+            elapsed = (time.perf_counter() - started) / repeat
+            self.stdout.write(f"{label:<24} {elapsed * 1000:8.2f} ms per {items} items")
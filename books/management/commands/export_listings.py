@@ -0,0 +1,37 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from books.exporters import EXPORT_FORMATS, export_queryset, export_rows, render_export
+from books.filters import CATALOG_FILTERS, parse_moment
+from books.models import BookListing
+
+
+class Command(BaseCommand):
+    help = "Stream the catalog as NDJSON or CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='ndjson')
+        parser.add_argument('--output', help="File to write to, defaults to stdout")
+        parser.add_argument('--updated-since', help="Only listings changed since this ISO date/datetime")
+        for name in CATALOG_FILTERS:
+            parser.add_argument(f"--{name.replace('_', '-')}", dest=name)
+
+    def handle(self, *args, **options):
+        updated_since = None
+        if options['updated_since']:
+            updated_since = parse_moment(options['updated_since'])
+            if updated_since is None:
+                raise CommandError("Invalid --updated-since")
+
+        params = {name: options[name] for name in CATALOG_FILTERS if options[name]}
+        queryset = export_queryset(BookListing.objects.all(), params, updated_since)
+        lines = render_export(export_rows(queryset), options['format'])
+
+        output = open(options['output'], 'w', encoding='utf-8', newline='') if options['output'] else sys.stdout
+        try:
+            for line in lines:
+                output.write(line)
+        finally:
+            if output is not sys.stdout:
+                output.close()
@@ -0,0 +1,38 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from books.importers import READ_ERRORS, ListingImporter, read_rows
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = "Import book listings for a seller from a CSV or JSONL file"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--user', required=True, help="Email of the seller")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help="Defaults to the file extension")
+        parser.add_argument('--batch-size', type=int)
+
+    def handle(self, *args, **options):
+        try:
+            user = CustomUser.objects.get(email=options['user'])
+        except CustomUser.DoesNotExist:
+            raise CommandError(f"User {options['user']} not found")
+
+        path = options['path']
+        file_format = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+        importer = ListingImporter(user, batch_size=options['batch_size'])
+        with open(path, 'rb') as stream:
+            try:
+                report = importer.run(read_rows(stream, file_format))
+            except READ_ERRORS as error:
+                report = importer.report()
+                raise CommandError(
+                    f"Could not read {path}: {error}. Created {report['created']} before the error"
+                )
+
+        for error in report['errors']:
+            self.stderr.write(json.dumps(error, ensure_ascii=False))
+        self.stdout.write(self.style.SUCCESS(f"Created {report['created']}, failed {report['failed']}"))
@@ -0,0 +1,72 @@
+from django.db import migrations
+
+from books.search import normalize
+
+BATCH_SIZE = 2000
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS books_booklisting_fts USING fts5("
+            "title, author, description, "
+            "tokenize='unicode61 remove_diacritics 0', prefix='2 3')"
+        )
+    elif connection.vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE TABLE IF NOT EXISTS books_booklisting_search ("
+            "listing_id bigint PRIMARY KEY REFERENCES books_booklisting (id) "
+            "ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+            "document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS books_booklisting_search_document_gin "
+            "ON books_booklisting_search USING GIN (document)"
+        )
+    else:
+        return
+
+    if connection.vendor == 'sqlite':
+        insert_sql = (
+            "INSERT INTO books_booklisting_fts (rowid, title, author, description) VALUES (%s, %s, %s, %s)"
+        )
+    else:
+        insert_sql = (
+            "INSERT INTO books_booklisting_search (listing_id, document) VALUES (%s, "
+            "setweight(to_tsvector('simple', %s), 'A') || "
+            "setweight(to_tsvector('simple', %s), 'B') || "
+            "setweight(to_tsvector('simple', %s), 'C'))"
+        )
+
+    BookListing = apps.get_model('books', 'BookListing')
+    listings = BookListing.objects.only('id', 'title', 'author', 'description').order_by('id')
+    rows = []
+    with connection.cursor() as cursor:
+        for listing in listings.iterator(chunk_size=BATCH_SIZE):
+            rows.append((
+                listing.id, normalize(listing.title), normalize(listing.author), normalize(listing.description)
+            ))
+            if len(rows) >= BATCH_SIZE:
+                cursor.executemany(insert_sql, rows)
+                rows = []
+        if rows:
+            cursor.executemany(insert_sql, rows)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS books_booklisting_fts")
+    elif schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("DROP TABLE IF EXISTS books_booklisting_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0006_favorite'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
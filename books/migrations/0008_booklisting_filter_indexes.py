@@ -0,0 +1,90 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def backfill_lookup_keys(apps, schema_editor):
+    BookListing = apps.get_model('books', 'BookListing')
+    Category = apps.get_model('books', 'Category')
+
+    categories = list(Category.objects.all())
+    for category in categories:
+        category.name_key = category.name.strip().casefold()
+    Category.objects.bulk_update(categories, ['name_key'], batch_size=BATCH_SIZE)
+
+    last_id = 0
+    while True:
+        batch = list(
+            BookListing.objects.filter(id__gt=last_id)
+            .select_related('user')
+            .only('id', 'seller_region', 'user__region')
+            .order_by('id')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        for listing in batch:
+            listing.seller_region = (listing.user.region or '').strip().casefold()
+        BookListing.objects.bulk_update(batch, ['seller_region'])
+        last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0007_booklisting_search_index'),
+        ('media', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booklisting',
+            name='seller_region',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='name_key',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=100),
+        ),
+        migrations.RunPython(backfill_lookup_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='booklisting',
+            index=models.Index(fields=['created_at', 'id'], name='listing_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booklisting',
+            index=models.Index(fields=['price', 'id'], name='listing_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booklisting',
+            index=models.Index(fields=['seller_region', 'created_at', 'id'], name='listing_region_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booklisting',
+            index=models.Index(fields=['seller_region', 'price', 'id'], name='listing_region_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booklisting',
+            index=models.Index(fields=['category', 'created_at', 'id'], name='listing_category_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booklisting',
+            index=models.Index(fields=['category', 'price', 'id'], name='listing_category_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booklisting',
+            index=models.Index(fields=['genre', 'created_at', 'id'], name='listing_genre_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booklisting',
+            index=models.Index(fields=['condition', 'created_at', 'id'], name='listing_condition_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booklisting',
+            index=models.Index(condition=models.Q(('photo__isnull', False)), fields=['created_at', 'id'], name='listing_photo_created_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def copy_created_at(apps, schema_editor):
+    BookListing = apps.get_model('books', 'BookListing')
+    BookListing.objects.update(updated_at=models.F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0008_booklisting_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booklisting',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(copy_created_at, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='booklisting',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0009_booklisting_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['status', 'buyer_confirmation_deadline'], name='tx_status_buyer_deadline_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:33
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0010_transaction_sweep_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='refund_attempts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='refund_error',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='refund_id',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='refund_status',
+            field=models.CharField(blank=True, choices=[('', 'Без повернення'), ('PROCESSING', 'Повернення виконується'), ('RETRY', 'Повернення буде повторено'), ('REFUNDED', 'Кошти повернено'), ('FAILED', 'Помилка повернення')], default='', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['status', 'seller_confirmation_deadline'], name='tx_status_seller_deadline_idx'),
+        ),
+    ]
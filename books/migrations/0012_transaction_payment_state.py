@@ -0,0 +1,28 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0011_transaction_refund_outcome'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='approval_url',
+            field=models.CharField(blank=True, default='', max_length=500),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='execute_requested_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='payment_error',
+            field=models.TextField(blank=True, default=''),
+        ),
+    ]
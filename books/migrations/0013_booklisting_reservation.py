@@ -0,0 +1,26 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0012_transaction_payment_state'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booklisting',
+            name='reserved_by',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reserved_listings', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='booklisting',
+            name='reserved_until',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:44
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0013_booklisting_reservation'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['seller', 'status', 'created_at', 'id'], name='tx_seller_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['seller', 'created_at', 'id'], name='tx_seller_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['buyer', 'status', 'created_at', 'id'], name='tx_buyer_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['buyer', 'created_at', 'id'], name='tx_buyer_created_idx'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_totals(apps, schema_editor):
+    Transaction = apps.get_model('books', 'Transaction')
+    SellerDailyTotals = apps.get_model('books', 'SellerDailyTotals')
+    grouped = (
+        Transaction.objects.annotate(day=TruncDate('created_at'))
+        .values('seller_id', 'day', 'status')
+        .annotate(total_count=Count('id'), total_gross=Sum('amount'),
+                  total_commission=Sum('platform_commission'), total_net=Sum('seller_amount'))
+        .order_by()
+    )
+    SellerDailyTotals.objects.bulk_create(
+        [
+            SellerDailyTotals(
+                seller_id=row['seller_id'], day=row['day'], status=row['status'], count=row['total_count'],
+                gross=row['total_gross'], commission=row['total_commission'], net=row['total_net'],
+            )
+            for row in grouped
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0014_transaction_history_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SellerDailyTotals',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(choices=[('PENDING', 'Очікує оплати'), ('PAID', 'Оплачено'), ('SELLER_CONFIRMED', 'Продавець підтвердив відправку'), ('BUYER_CONFIRMED', 'Покупець підтвердив отримання'), ('COMPLETED', 'Завершено'), ('CANCELLED', 'Скасовано'), ('DISPUTED', 'Суперечка')], max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('gross', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('commission', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('net', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('seller', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_totals', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('seller', 'day', 'status'), name='seller_daily_totals_unique')],
+            },
+        ),
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,19 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
+from django.dispatch import Signal
+from django.utils import timezone
+
+def lookup_key(value):
+    # Case-folded copy of a user-facing name, so that case-insensitive filters can use an index
+    return (value or '').strip().casefold()
 
 class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
+    name_key = models.CharField(max_length=100, db_index=True, editable=False, default='')
+
+    def save(self, *args, **kwargs):
+        self.name_key = lookup_key(self.name)
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.name
@@ -28,8 +39,38 @@ class BookListing(models.Model):
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, related_name="listings")
     genre = models.ForeignKey(Genre, on_delete=models.SET_NULL, null=True, related_name="listings")
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     condition = models.CharField(max_length=20, choices=CONDITION_CHOICES, default='new')
     is_sold = models.BooleanField(default=False) 
+    # Case-folded copy of user.region, kept in sync by books.signals
+    seller_region = models.CharField(max_length=100, blank=True, default='', editable=False)
+    # Buyer currently going through checkout, see books.reservations
+    reserved_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name="reserved_listings", editable=False,
+    )
+    reserved_until = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='listing_created_idx'),
+            models.Index(fields=['price', 'id'], name='listing_price_idx'),
+            models.Index(fields=['seller_region', 'created_at', 'id'], name='listing_region_created_idx'),
+            models.Index(fields=['seller_region', 'price', 'id'], name='listing_region_price_idx'),
+            models.Index(fields=['category', 'created_at', 'id'], name='listing_category_created_idx'),
+            models.Index(fields=['category', 'price', 'id'], name='listing_category_price_idx'),
+            models.Index(fields=['genre', 'created_at', 'id'], name='listing_genre_created_idx'),
+            models.Index(fields=['condition', 'created_at', 'id'], name='listing_condition_created_idx'),
+            models.Index(
+                fields=['created_at', 'id'], name='listing_photo_created_idx',
+                condition=models.Q(photo__isnull=False),
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self._state.adding and self.user_id:
+            self.seller_region = lookup_key(self.user.region)
+        super().save(*args, **kwargs)
 
     @property
     def location(self):
@@ -38,6 +79,57 @@ class BookListing(models.Model):
     def __str__(self):
         return self.title
     
+# Statuses each status may move to
+TRANSACTION_TRANSITIONS = {
+    'PENDING': {'PAID', 'CANCELLED'},
+    'PAID': {'SELLER_CONFIRMED', 'CANCELLED'},
+    'SELLER_CONFIRMED': {'BUYER_CONFIRMED', 'COMPLETED', 'DISPUTED'},
+    'BUYER_CONFIRMED': {'COMPLETED'},
+    'DISPUTED': {'COMPLETED', 'CANCELLED'},
+}
+
+
+# Sent inside the database transaction of every status transition with
+# ``rows``: dicts of TRANSITION_VALUES plus the previous ``status``, and ``target``
+transaction_transitioned = Signal()
+
+TRANSITION_VALUES = ('id', 'status', 'seller_id', 'created_at', 'amount', 'platform_commission', 'seller_amount')
+
+
+def check_transition(sources, target):
+    for status in sources:
+        if target not in TRANSACTION_TRANSITIONS.get(status, ()):
+            raise ValueError(f"Invalid transaction transition {status} -> {target}")
+
+
+class TransactionQuerySet(models.QuerySet):
+    def transition(self, source, target, **fields):
+        """Move the rows still in ``source`` to ``target`` with one conditional UPDATE.
+
+        ``source`` is a status or a collection of statuses. Only ``status``,
+        ``updated_at`` and the given fields are written. Rows another writer
+        has already moved are left alone; returns the number of rows moved.
+        """
+        sources = (source,) if isinstance(source, str) else tuple(source)
+        check_transition(sources, target)
+        stamp = fields.setdefault('updated_at', timezone.now())
+        with transaction.atomic():
+            candidates = {row['id']: row for row in self.filter(status__in=sources).values(*TRANSITION_VALUES)}
+            if not candidates:
+                return 0
+            moved = Transaction.objects.filter(id__in=candidates, status__in=sources).update(status=target, **fields)
+            if moved < len(candidates):
+                # Some rows were moved by another writer in between; keep the ones this call moved
+                won = set(
+                    Transaction.objects.filter(id__in=candidates, status=target, updated_at=stamp)
+                    .values_list('id', flat=True)
+                )
+                candidates = {pk: row for pk, row in candidates.items() if pk in won}
+            if candidates:
+                transaction_transitioned.send(sender=Transaction, rows=list(candidates.values()), target=target)
+        return moved
+
+
 class Transaction(models.Model):
     STATUS_CHOICES = [
         ('PENDING', 'Очікує оплати'),
@@ -48,6 +140,13 @@ class Transaction(models.Model):
         ('CANCELLED', 'Скасовано'),
         ('DISPUTED', 'Суперечка'),
     ]
+    REFUND_STATUS_CHOICES = [
+        ('', 'Без повернення'),
+        ('PROCESSING', 'Повернення виконується'),
+        ('RETRY', 'Повернення буде повторено'),
+        ('REFUNDED', 'Кошти повернено'),
+        ('FAILED', 'Помилка повернення'),
+    ]
 
     book = models.ForeignKey(BookListing, on_delete=models.CASCADE, related_name="transactions")
     buyer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="purchases")
@@ -61,10 +160,79 @@ class Transaction(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     seller_confirmation_deadline = models.DateTimeField(null=True, blank=True)
     buyer_confirmation_deadline = models.DateTimeField(null=True, blank=True)
+    # Filled in by the payment tasks; the buyer polls for them
+    approval_url = models.CharField(max_length=500, blank=True, default='')
+    payment_error = models.TextField(blank=True, default='')
+    execute_requested_at = models.DateTimeField(null=True, blank=True)
+    # Outcome of the automatic refund after a missed seller deadline
+    refund_status = models.CharField(max_length=20, choices=REFUND_STATUS_CHOICES, blank=True, default='')
+    refund_id = models.CharField(max_length=100, blank=True, default='')
+    refund_error = models.TextField(blank=True, default='')
+    refund_attempts = models.PositiveIntegerField(default=0)
+
+    objects = TransactionQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Periodic sweepers look up overdue transactions per status
+            models.Index(fields=['status', 'buyer_confirmation_deadline'], name='tx_status_buyer_deadline_idx'),
+            models.Index(fields=['status', 'seller_confirmation_deadline'], name='tx_status_seller_deadline_idx'),
+            # Transaction history pages, with and without a status filter
+            models.Index(fields=['seller', 'status', 'created_at', 'id'], name='tx_seller_status_created_idx'),
+            models.Index(fields=['seller', 'created_at', 'id'], name='tx_seller_created_idx'),
+            models.Index(fields=['buyer', 'status', 'created_at', 'id'], name='tx_buyer_status_created_idx'),
+            models.Index(fields=['buyer', 'created_at', 'id'], name='tx_buyer_created_idx'),
+        ]
+
+    def transition(self, source, target, condition=None, **fields):
+        """Compare-and-swap this transaction from ``source`` to ``target``.
+
+        ``condition`` is an optional ``Q`` the row must also match, e.g. a
+        deadline. Returns True if this call made the transition; the instance
+        is then updated in place. False means another writer got there first
+        or the condition no longer holds.
+        """
+        check_transition((source,), target)
+        fields.setdefault('updated_at', timezone.now())
+        queryset = Transaction.objects.filter(pk=self.pk, status=source)
+        if condition is not None:
+            queryset = queryset.filter(condition)
+        with transaction.atomic():
+            won = queryset.update(status=target, **fields) == 1
+            if won:
+                row = {name: getattr(self, name) for name in TRANSITION_VALUES}
+                row['status'] = source
+                transaction_transitioned.send(sender=Transaction, rows=[row], target=target)
+        if won:
+            self.status = target
+            for name, value in fields.items():
+                setattr(self, name, value)
+        return won
 
     def __str__(self):
         return f"Transaction {self.id} for {self.book.title}"
     
+class SellerDailyTotals(models.Model):
+    """Per-seller, per-day, per-status sums of transactions, maintained by books.ledger.
+
+    A transaction is counted on the day it was created, under its current status.
+    """
+    seller = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="daily_totals")
+    day = models.DateField()
+    status = models.CharField(max_length=20, choices=Transaction.STATUS_CHOICES)
+    count = models.IntegerField(default=0)
+    gross = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    commission = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    net = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['seller', 'day', 'status'], name='seller_daily_totals_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.seller_id} {self.day} {self.status}: {self.count}"
+
 class Favorite(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="favorites")
     book_listing = models.ForeignKey(BookListing, on_delete=models.CASCADE, related_name="favorited_by")
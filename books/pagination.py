@@ -0,0 +1,127 @@
+# books/pagination.py
+import base64
+import hashlib
+import json
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from .cache import catalog_version, get_cache
+
+
+class KeysetPagination:
+    """Cursor pagination over ``(sort key, id)``.
+
+    Every page is a single index range scan, no matter how deep the client
+    scrolls, and no ``COUNT(*)`` is run unless the client asks for it.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'items_per_page'
+    page_size = 20
+    max_page_size = 100
+    invalid_cursor_message = 'Неверный курсор'
+
+    # sort name -> (field, descending)
+    orderings = {
+        'newest': ('created_at', True),
+        'oldest': ('created_at', False),
+        'price_asc': ('price', False),
+        'price_desc': ('price', True),
+    }
+
+    def paginate_queryset(self, queryset, request, sort):
+        self.request = request
+        self.sort = sort
+        field, descending = self.orderings[sort]
+        model_field = queryset.model._meta.get_field(field)
+
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            try:
+                key = model_field.to_python(cursor['k'])
+                last_id = int(cursor['i'])
+            except Exception:
+                raise NotFound(self.invalid_cursor_message)
+            if descending:
+                queryset = queryset.filter(Q(**{f'{field}__lt': key}) | Q(**{field: key, 'id__lt': last_id}))
+            else:
+                queryset = queryset.filter(Q(**{f'{field}__gt': key}) | Q(**{field: key, 'id__gt': last_id}))
+
+        prefix = '-' if descending else ''
+        queryset = queryset.order_by(f'{prefix}{field}', f'{prefix}id')
+
+        page_size = self.get_page_size(request)
+        page = list(queryset[:page_size + 1])
+        self.has_next = len(page) > page_size
+        page = page[:page_size]
+        self.next_cursor = None
+        if self.has_next:
+            last = page[-1]
+            if isinstance(last, dict):
+                key, last_id = last[field], last['id']
+            else:
+                key, last_id = getattr(last, field), last.pk
+            self.next_cursor = self.encode_cursor(key.isoformat() if hasattr(key, 'isoformat') else str(key), last_id)
+        return page
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def encode_cursor(self, key, last_id):
+        payload = json.dumps({'s': self.sort, 'k': key, 'i': last_id}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            cursor = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(cursor, dict) or cursor.get('s') != self.sort or 'k' not in cursor or 'i' not in cursor:
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+    def get_next_link(self):
+        if not self.next_cursor:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data, count=None):
+        body = {'next': self.get_next_link(), 'results': data}
+        if count is not None:
+            body['count'] = count
+        return Response(body)
+
+
+class TransactionHistoryPagination(KeysetPagination):
+    orderings = {
+        'newest': ('created_at', True),
+        'oldest': ('created_at', False),
+    }
+
+
+def cached_count(queryset, timeout=None):
+    """Count rows, reusing the result for identical queries for a short while."""
+    if timeout is None:
+        timeout = settings.CATALOG_COUNT_CACHE_SECONDS
+    signature = hashlib.sha1(str(queryset.order_by().query).encode()).hexdigest()
+    key = f'catalog:count:v{catalog_version()}:{signature}'
+    cache = get_cache()
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, timeout)
+    return count
@@ -0,0 +1,380 @@
+# books/payments.py
+"""Payment gateway shared by the payment views and the refund sweeper.
+
+A single process-wide client keeps its HTTPS connections pooled and its OAuth
+token cached between calls. Every call goes through a circuit breaker and is
+timed into a per-operation latency histogram. The backend is chosen with
+``PAYMENT_GATEWAY_BACKEND``; ``FakePaymentBackend`` answers in-process so the
+payment path can be load-tested without PayPal.
+"""
+import threading
+import time
+import uuid
+from urllib.parse import urlencode
+
+import paypalrestsdk
+import requests
+from django.conf import settings
+from django.utils.module_loading import import_string
+from paypalrestsdk import exceptions as paypal_exceptions
+from paypalrestsdk.resource import Resource
+from requests.adapters import HTTPAdapter
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+LATENCY_BUCKETS_MS = (25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class PaymentError(Exception):
+    """The gateway could not be reached or failed; the same call may succeed later."""
+
+
+class PaymentDeclined(PaymentError):
+    """The gateway rejected the request; retrying it will not help."""
+
+    def __init__(self, error):
+        super().__init__(str(error))
+        self.error = error
+
+
+class GatewayUnavailable(PaymentError):
+    """The circuit breaker is open and calls are refused without reaching the gateway."""
+
+
+class CircuitBreaker:
+    """Opens after ``threshold`` consecutive failures and lets a single probe
+    through once ``recovery_seconds`` have passed."""
+
+    def __init__(self, threshold, recovery_seconds):
+        self.threshold = threshold
+        self.recovery_seconds = recovery_seconds
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.recovery_seconds:
+            return 'half-open'
+        return 'open'
+
+    def before_call(self):
+        with self.lock:
+            state = self.state
+            if state == 'closed':
+                return
+            if state == 'half-open' and not self.probing:
+                self.probing = True
+                return
+        raise GatewayUnavailable("Payment gateway circuit is open")
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.probing = False
+            if self.opened_at is not None or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+class LatencyHistogram:
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.operations = {}
+
+    def observe(self, operation, outcome, elapsed_ms):
+        with self.lock:
+            stats = self.operations.setdefault(operation, {
+                'count': 0,
+                'sum_ms': 0.0,
+                'max_ms': 0.0,
+                'outcomes': {},
+                'buckets': [0] * (len(self.buckets) + 1),
+            })
+            stats['count'] += 1
+            stats['sum_ms'] += elapsed_ms
+            stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+            stats['outcomes'][outcome] = stats['outcomes'].get(outcome, 0) + 1
+            index = next((i for i, bound in enumerate(self.buckets) if elapsed_ms <= bound), len(self.buckets))
+            stats['buckets'][index] += 1
+
+    def snapshot(self):
+        labels = [f'le_{bound}' for bound in self.buckets] + ['le_inf']
+        with self.lock:
+            return {
+                operation: {
+                    'count': stats['count'],
+                    'avg_ms': round(stats['sum_ms'] / stats['count'], 2),
+                    'max_ms': round(stats['max_ms'], 2),
+                    'outcomes': dict(stats['outcomes']),
+                    'buckets': dict(zip(labels, stats['buckets'])),
+                }
+                for operation, stats in self.operations.items()
+            }
+
+
+class PooledApi(paypalrestsdk.Api):
+    """paypalrestsdk client that reuses one HTTP session and enforces timeouts."""
+
+    def __init__(self, options=None, session=None, timeout=None, **kwargs):
+        super().__init__(options, **kwargs)
+        self.session = session or requests.Session()
+        self.timeout = timeout
+        self.token_lock = threading.Lock()
+
+    def get_token_hash(self, authorization_code=None, refresh_token=None, headers=None):
+        # Concurrent callers wait for one token request instead of each fetching their own
+        with self.token_lock:
+            return super().get_token_hash(authorization_code, refresh_token, headers)
+
+    def http_call(self, url, method, **kwargs):
+        response = self.session.request(method, url, proxies=self.proxies, timeout=self.timeout, **kwargs)
+        return self.handle_response(response, response.content.decode('utf-8'))
+
+
+class PaymentBackend:
+    def create_payment(self, amount, description, return_url, cancel_url):
+        """Return ``(payment_id, approval_url)``."""
+        raise NotImplementedError
+
+    def execute_payment(self, payment_id, payer_id, request_id=None):
+        raise NotImplementedError
+
+    def refund_payment(self, payment_id, amount, request_id=None):
+        """Refund a payment in full and return the refund id."""
+        raise NotImplementedError
+
+
+class PayPalBackend(PaymentBackend):
+    def __init__(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=settings.PAYMENT_GATEWAY_POOL_SIZE,
+            pool_maxsize=settings.PAYMENT_GATEWAY_POOL_SIZE,
+        )
+        session.mount('https://', adapter)
+        self.api = PooledApi(
+            mode=settings.PAYPAL_MODE,
+            client_id=settings.PAYPAL_CLIENT_ID,
+            client_secret=settings.PAYPAL_CLIENT_SECRET,
+            session=session,
+            timeout=(settings.PAYMENT_GATEWAY_CONNECT_TIMEOUT, settings.PAYMENT_GATEWAY_READ_TIMEOUT),
+        )
+
+    def request(self, func, *args):
+        try:
+            return func(*args)
+        except paypal_exceptions.ClientError as error:
+            raise PaymentDeclined(str(error))
+        except (paypal_exceptions.ConnectionError, requests.RequestException) as error:
+            raise PaymentError(str(error))
+
+    @staticmethod
+    def raise_for_error(resource):
+        # Bad requests are not raised by paypalrestsdk but left on ``resource.error``
+        if resource.error:
+            raise PaymentDeclined(resource.error)
+
+    def create_payment(self, amount, description, return_url, cancel_url):
+        payment = paypalrestsdk.Payment({
+            "intent": "sale",
+            "payer": {
+                "payment_method": "paypal"
+            },
+            "transactions": [{
+                "amount": {
+                    "total": str(amount),
+                    "currency": "USD"
+                },
+                "description": description
+            }],
+            "redirect_urls": {
+                "return_url": return_url,
+                "cancel_url": cancel_url
+            }
+        }, api=self.api)
+        self.request(payment.create)
+        self.raise_for_error(payment)
+        for link in payment.links or []:
+            if link.rel == "approval_url":
+                return payment.id, link.href
+        raise PaymentError(f"No approval URL for payment {payment.id}")
+
+    def execute_payment(self, payment_id, payer_id, request_id=None):
+        # Executing needs only the id, so skip the lookup round trip
+        payment = paypalrestsdk.Payment({"id": payment_id}, api=self.api)
+        attributes = Resource({"payer_id": payer_id}, api=self.api)
+        # A stable request id lets PayPal recognise a retry after a timeout
+        attributes.request_id = request_id
+        try:
+            self.request(payment.execute, attributes)
+            self.raise_for_error(payment)
+        except PaymentDeclined as declined:
+            if not self.already_executed(payment_id, declined.error):
+                raise
+
+    def already_executed(self, payment_id, error):
+        """Whether a declined execute is a retry of one that went through earlier."""
+        if isinstance(error, dict) and error.get('name') == 'PAYMENT_ALREADY_DONE':
+            return True
+        try:
+            payment = self.request(paypalrestsdk.Payment.find, payment_id, self.api)
+        except PaymentDeclined:
+            return False
+        return not payment.error and payment.state == 'approved'
+
+    def refund_payment(self, payment_id, amount, request_id=None):
+        # paypal_transaction_id stores the payment id; refunds are issued against its sale
+        payment = self.request(paypalrestsdk.Payment.find, payment_id, self.api)
+        self.raise_for_error(payment)
+        sale_id = find_sale_id(payment)
+        if sale_id is None:
+            raise PaymentDeclined(f"No sale found for payment {payment_id}")
+        sale = paypalrestsdk.Sale({"id": sale_id}, api=self.api)
+        attributes = Resource({"amount": {"total": str(amount), "currency": "USD"}}, api=self.api)
+        # A stable request id makes retried refunds idempotent on the PayPal side
+        attributes.request_id = request_id
+        refund = self.request(sale.refund, attributes)
+        self.raise_for_error(refund)
+        return refund.id
+
+
+def find_sale_id(payment):
+    for item in payment.transactions or []:
+        for resource in item.related_resources or []:
+            if resource.sale:
+                return resource.sale.id
+    return None
+
+
+class FakePaymentBackend(PaymentBackend):
+    """In-process stand-in for PayPal that approves everything.
+
+    The buyer is "redirected" straight back to ``return_url`` with the
+    ``paymentId`` and ``PayerID`` the execute endpoint expects.
+    """
+
+    def __init__(self):
+        self.latency = settings.PAYMENT_FAKE_LATENCY_SECONDS
+        self.lock = threading.Lock()
+        self.payments = {}
+        self.refunds = {}
+
+    def wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def create_payment(self, amount, description, return_url, cancel_url):
+        self.wait()
+        payment_id = f'PAYID-FAKE-{uuid.uuid4().hex[:20].upper()}'
+        with self.lock:
+            self.payments[payment_id] = {'amount': str(amount), 'state': 'created'}
+        separator = '&' if '?' in return_url else '?'
+        query = urlencode({'paymentId': payment_id, 'token': 'EC-FAKE', 'PayerID': 'FAKEPAYER'})
+        return payment_id, f'{return_url}{separator}{query}'
+
+    def execute_payment(self, payment_id, payer_id, request_id=None):
+        self.wait()
+        with self.lock:
+            payment = self.payments.get(payment_id)
+            if payment is None:
+                raise PaymentDeclined({'name': 'INVALID_RESOURCE_ID', 'message': 'Unknown payment'})
+            if payment['state'] == 'approved':
+                # Like PayPal, a repeated execute succeeds; the approved payment is not charged twice
+                return
+            if payment['state'] != 'created':
+                raise PaymentDeclined({'name': 'PAYMENT_STATE_INVALID', 'message': 'Payment was refunded'})
+            payment['state'] = 'approved'
+
+    def refund_payment(self, payment_id, amount, request_id=None):
+        self.wait()
+        with self.lock:
+            if request_id in self.refunds:
+                return self.refunds[request_id]
+            payment = self.payments.get(payment_id)
+            if payment is None or payment['state'] != 'approved':
+                raise PaymentDeclined({'name': 'INVALID_RESOURCE_ID', 'message': 'Unknown payment'})
+            payment['state'] = 'refunded'
+            refund_id = f'FAKE-REFUND-{uuid.uuid4().hex[:12].upper()}'
+            if request_id:
+                self.refunds[request_id] = refund_id
+            return refund_id
+
+
+class PaymentGateway:
+    def __init__(self, backend):
+        self.backend = backend
+        self.breaker = CircuitBreaker(
+            settings.PAYMENT_GATEWAY_FAILURE_THRESHOLD, settings.PAYMENT_GATEWAY_RECOVERY_SECONDS
+        )
+        self.latency = LatencyHistogram()
+
+    def call(self, operation, *args, **kwargs):
+        self.breaker.before_call()
+        started = time.monotonic()
+        outcome = 'ok'
+        try:
+            result = getattr(self.backend, operation)(*args, **kwargs)
+        except PaymentDeclined:
+            # A rejection is a healthy response from the gateway
+            outcome = 'declined'
+            self.breaker.record_success()
+            raise
+        except PaymentError:
+            outcome = 'error'
+            self.breaker.record_failure()
+            raise
+        except Exception as error:
+            outcome = 'error'
+            self.breaker.record_failure()
+            raise PaymentError(str(error)) from error
+        finally:
+            self.latency.observe(operation, outcome, (time.monotonic() - started) * 1000)
+        self.breaker.record_success()
+        return result
+
+    def create_payment(self, amount, description, return_url, cancel_url):
+        return self.call('create_payment', amount, description, return_url, cancel_url)
+
+    def execute_payment(self, payment_id, payer_id, request_id=None):
+        return self.call('execute_payment', payment_id, payer_id, request_id=request_id)
+
+    def refund_payment(self, payment_id, amount, request_id=None):
+        return self.call('refund_payment', payment_id, amount, request_id=request_id)
+
+    def stats(self):
+        return {
+            'backend': f'{type(self.backend).__module__}.{type(self.backend).__name__}',
+            'circuit': self.breaker.state,
+            'consecutive_failures': self.breaker.failures,
+            'latency': self.latency.snapshot(),
+        }
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway():
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                backend = import_string(settings.PAYMENT_GATEWAY_BACKEND)()
+                _gateway = PaymentGateway(backend)
+    return _gateway
+
+
+def reset_gateway():
+    """Drop the shared client, e.g. after changing the backend settings."""
+    global _gateway
+    with _gateway_lock:
+        _gateway = None
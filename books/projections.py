@@ -0,0 +1,156 @@
+# books/projections.py
+"""Read-only rendering of listing collections straight from ``values()`` rows.
+
+Produces the same JSON as ``BookListingSerializer(many=True)`` without
+building model instances or running the serializer field machinery per row.
+"""
+from django.core.files.storage import default_storage
+from rest_framework import serializers
+
+from users.models import CustomUser
+
+from .loaders import favorited_ids
+from .models import Transaction
+
+LISTING_VALUES = (
+    'id', 'title', 'description', 'price', 'created_at', 'condition', 'is_sold',
+    'photo_id', 'photo__image', 'photo__thumbnail', 'photo__medium', 'category_id', 'category__name', 'genre_id', 'genre__name',
+    'user_id', 'user__region',
+)
+
+TRANSACTION_VALUES = (
+    'id', 'book_id', 'book__title', 'buyer_id', 'seller_id', 'amount', 'platform_commission',
+    'seller_amount', 'paypal_transaction_id', 'status', 'created_at', 'updated_at',
+    'seller_confirmation_deadline', 'buyer_confirmation_deadline',
+)
+
+USER_VALUES = (
+    'id', 'email', 'first_name', 'last_name', 'birth_date', 'region', 'city', 'phone_number',
+    'avatar_id', 'avatar__image', 'avatar__thumbnail', 'avatar__medium',
+)
+
+# Reuse DRF's formatting so the output is byte-for-byte the serializer's
+_money = serializers.DecimalField(max_digits=10, decimal_places=2)
+_datetime = serializers.DateTimeField()
+_date = serializers.DateField()
+
+
+def _format(field, value):
+    return None if value is None else field.to_representation(value)
+
+
+def _image_url(name, request):
+    if not name:
+        return None
+    url = default_storage.url(name)
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
+
+
+def _photo(row, prefix, request):
+    photo_id = row[f'{prefix}_id']
+    if photo_id is None:
+        return None
+    image = row[f'{prefix}__image']
+    # Variants fall back to the original until they have been generated
+    return {
+        'id': photo_id,
+        'image': _image_url(image, request),
+        'thumbnail': _image_url(row[f'{prefix}__thumbnail'] or image, request),
+        'medium': _image_url(row[f'{prefix}__medium'] or image, request),
+    }
+
+
+def _user(row, request):
+    return {
+        'id': row['id'],
+        'email': row['email'],
+        'first_name': row['first_name'],
+        'last_name': row['last_name'],
+        'birth_date': _format(_date, row['birth_date']),
+        'region': row['region'],
+        'city': row['city'],
+        'phone_number': row['phone_number'],
+        'avatar': _photo(row, 'avatar', request),
+    }
+
+
+def _transactions_by_listing(listing_ids, request):
+    rows = list(
+        Transaction.objects.filter(book_id__in=listing_ids).order_by('id').values(*TRANSACTION_VALUES)
+    )
+    if not rows:
+        return {}
+
+    user_ids = {row['buyer_id'] for row in rows} | {row['seller_id'] for row in rows}
+    users = {
+        row['id']: _user(row, request)
+        for row in CustomUser.objects.filter(id__in=user_ids).values(*USER_VALUES)
+    }
+
+    grouped = {}
+    for row in rows:
+        grouped.setdefault(row['book_id'], []).append({
+            'id': row['id'],
+            'book': {'id': row['book_id'], 'title': row['book__title']},
+            'buyer': users.get(row['buyer_id']),
+            'seller': users.get(row['seller_id']),
+            'amount': _format(_money, row['amount']),
+            'platform_commission': _format(_money, row['platform_commission']),
+            'seller_amount': _format(_money, row['seller_amount']),
+            'paypal_transaction_id': row['paypal_transaction_id'],
+            'status': row['status'],
+            'created_at': _format(_datetime, row['created_at']),
+            'updated_at': _format(_datetime, row['updated_at']),
+            'seller_confirmation_deadline': _format(_datetime, row['seller_confirmation_deadline']),
+            'buyer_confirmation_deadline': _format(_datetime, row['buyer_confirmation_deadline']),
+        })
+    return grouped
+
+
+def render_listings(rows, request=None, include_transactions=True, absolute_urls=True):
+    """Render rows of ``queryset.values(*LISTING_VALUES)`` as listing dicts.
+
+    ``request`` resolves favorites; with ``absolute_urls=False`` image URLs
+    stay relative, like a serializer rendered without the request in context.
+    """
+    rows = list(rows)
+    listing_ids = [row['id'] for row in rows]
+    url_request = request if absolute_urls else None
+    transactions = {}
+    if include_transactions and rows:
+        transactions = _transactions_by_listing(listing_ids, url_request)
+    favorited = favorited_ids(getattr(request, 'user', None), listing_ids)
+
+    category_cache = {}
+    genre_cache = {}
+    results = []
+    for row in rows:
+        category_id = row['category_id']
+        if category_id is not None and category_id not in category_cache:
+            category_cache[category_id] = {'id': category_id, 'name': row['category__name']}
+        genre_id = row['genre_id']
+        if genre_id is not None and genre_id not in genre_cache:
+            genre_cache[genre_id] = {'id': genre_id, 'name': row['genre__name']}
+
+        listing = {
+            'id': row['id'],
+            'title': row['title'],
+            'description': row['description'],
+            'price': _format(_money, row['price']),
+            'photo_detail': _photo(row, 'photo', url_request),
+            'category': dict(category_cache[category_id]) if category_id is not None else None,
+            'genre': dict(genre_cache[genre_id]) if genre_id is not None else None,
+            'user': row['user_id'],
+            'created_at': _format(_datetime, row['created_at']),
+            'location': row['user__region'],
+            'condition': row['condition'],
+            'is_sold': row['is_sold'],
+            'transactions': transactions.get(row['id'], []),
+            'is_favorited': row['id'] in favorited,
+        }
+        if not include_transactions:
+            del listing['transactions']
+        results.append(listing)
+    return results
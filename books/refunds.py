@@ -0,0 +1,127 @@
+# books/refunds.py
+"""Refunds for paid transactions whose seller missed the confirmation deadline.
+
+Rows are claimed with a conditional UPDATE so overlapping sweeps never refund
+the same transaction twice. PayPal calls run in a bounded thread pool and the
+outcomes are written back in bulk from the calling thread.
+"""
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .cache import bump_catalog_version
+from .models import BookListing, Transaction
+from .payments import GatewayUnavailable, PaymentDeclined, PaymentError, get_gateway
+
+logger = logging.getLogger(__name__)
+
+OUTCOME_FIELDS = ['refund_status', 'refund_id', 'refund_error', 'refund_attempts', 'updated_at']
+
+
+def expired_transactions(now):
+    stale = now - timedelta(seconds=settings.TRANSACTION_REFUND_CLAIM_TIMEOUT_SECONDS)
+    return Transaction.objects.filter(
+        # RETRY rows written during the current sweep wait for the next one
+        Q(refund_status='') | Q(refund_status='RETRY', updated_at__lt=now)
+        | Q(refund_status='PROCESSING', updated_at__lt=stale),
+        status='PAID',
+        seller_confirmation_deadline__lte=now,
+    )
+
+
+def claim_expired_transactions(batch_size, now):
+    """Mark up to ``batch_size`` expired transactions PROCESSING.
+
+    Returns ``(selected, claimed)``: the number of candidates found and the
+    ones this call claimed. A concurrent sweep may win some or all of them.
+    """
+    ids = list(
+        expired_transactions(now).order_by('seller_confirmation_deadline').values_list('id', flat=True)[:batch_size]
+    )
+    if not ids:
+        return 0, []
+    # The claim time doubles as a token: only rows this call updated carry it
+    claimed_at = timezone.now()
+    expired_transactions(now).filter(id__in=ids).update(refund_status='PROCESSING', updated_at=claimed_at)
+    return len(ids), list(
+        Transaction.objects.filter(id__in=ids, refund_status='PROCESSING', updated_at=claimed_at)
+        .only('id', 'book_id', 'amount', 'paypal_transaction_id', 'refund_attempts')
+    )
+
+
+def refund_with_retry(tx, max_attempts, backoff):
+    """Refund one transaction, backing off between transient failures.
+
+    Runs in a worker thread and does not touch the database.
+    Returns ``(refund_status, refund_id, error, attempts)``.
+    """
+    if not tx.paypal_transaction_id:
+        return 'FAILED', '', 'Нет идентификатора платежа PayPal', 0
+
+    gateway = get_gateway()
+    request_id = f'refund-{tx.id}'
+    for attempt in range(1, max_attempts + 1):
+        try:
+            refund_id = gateway.refund_payment(tx.paypal_transaction_id, tx.amount, request_id=request_id)
+        except PaymentDeclined as error:
+            return 'FAILED', '', str(error.error), attempt
+        except GatewayUnavailable as error:
+            # Backing off inside the sweep is pointless while the circuit is open
+            return 'RETRY', '', str(error), attempt - 1
+        except PaymentError as error:
+            if attempt == max_attempts:
+                return 'RETRY', '', str(error), attempt
+            time.sleep(backoff * 2 ** (attempt - 1) + random.uniform(0, backoff))
+            continue
+        return 'REFUNDED', refund_id or '', '', attempt
+    return 'RETRY', '', '', max_attempts
+
+
+def refund_transactions(transactions, concurrency=None, max_attempts=None, backoff=None):
+    """Refund the claimed transactions in parallel and record every outcome.
+
+    Refunded transactions are CANCELLED and their listings go back on sale.
+    Returns a dict of counts per refund status.
+    """
+    concurrency = concurrency or settings.TRANSACTION_REFUND_CONCURRENCY
+    max_attempts = max_attempts or settings.TRANSACTION_REFUND_MAX_ATTEMPTS
+    backoff = settings.TRANSACTION_REFUND_BACKOFF_SECONDS if backoff is None else backoff
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(lambda tx: refund_with_retry(tx, max_attempts, backoff), transactions))
+
+    now = timezone.now()
+    counts = {'REFUNDED': 0, 'RETRY': 0, 'FAILED': 0}
+    refunded = []
+    for tx, (refund_status, refund_id, error, attempts) in zip(transactions, outcomes):
+        if refund_status == 'RETRY' and tx.refund_attempts + attempts >= settings.TRANSACTION_REFUND_MAX_TOTAL_ATTEMPTS:
+            # Stop retrying across sweeps and leave the refund to an operator
+            refund_status = 'FAILED'
+            error = f"Превышено число попыток возврата: {error}"
+        tx.refund_status = refund_status
+        tx.refund_id = refund_id
+        tx.refund_error = error
+        tx.refund_attempts += attempts
+        tx.updated_at = now
+        counts[refund_status] += 1
+        if refund_status == 'REFUNDED':
+            refunded.append(tx)
+        else:
+            log = logger.error if refund_status == 'FAILED' else logger.warning
+            log("Refund of transaction %s failed (%s): %s", tx.id, refund_status, error)
+
+    with transaction.atomic():
+        Transaction.objects.bulk_update(transactions, OUTCOME_FIELDS)
+        if refunded:
+            Transaction.objects.filter(id__in=[tx.id for tx in refunded]).transition('PAID', 'CANCELLED', updated_at=now)
+            BookListing.objects.filter(id__in=[tx.book_id for tx in refunded]).update(is_sold=False, updated_at=now)
+    if refunded:
+        bump_catalog_version()
+    return counts
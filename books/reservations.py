@@ -0,0 +1,33 @@
+# books/reservations.py
+"""Short exclusive holds on a listing while a buyer goes through checkout.
+
+Each hold is taken with a single conditional UPDATE, so out of any number of
+concurrent buyers exactly one gets the listing and creates a payment. The
+UPDATE row lock also serializes concurrent requests of the same buyer when
+it runs in the same database transaction as the payment bookkeeping.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import BookListing
+
+
+def _available(now):
+    return Q(reserved_by__isnull=True) | Q(reserved_until__isnull=True) | Q(reserved_until__lt=now)
+
+
+def hold_listing(book_id, user_id):
+    """Take or renew this buyer's hold; fails while another buyer holds the listing."""
+    now = timezone.now()
+    until = now + timedelta(minutes=settings.PAYMENT_RESERVATION_MINUTES)
+    return bool(
+        BookListing.objects.filter(_available(now) | Q(reserved_by_id=user_id), id=book_id, is_sold=False)
+        .update(reserved_by_id=user_id, reserved_until=until)
+    )
+
+
+def release_reservation(book_id, user_id):
+    BookListing.objects.filter(id=book_id, reserved_by_id=user_id).update(reserved_by=None, reserved_until=None)
@@ -0,0 +1,164 @@
+# books/search.py
+import re
+import unicodedata
+
+from django.db import connection
+from django.db.models import FloatField, Q, Value
+
+from .models import BookListing
+
+FTS_TABLE = 'books_booklisting_fts'
+TSV_TABLE = 'books_booklisting_search'
+
+# Title matches weigh more than author, author more than description
+SQLITE_WEIGHTS = (10.0, 5.0, 1.0)
+
+_APOSTROPHES = re.compile("['’ʼ`‘]")
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+# Stress marks used in Ukrainian/Russian texts (а́, о̀)
+_STRESS_MARKS = {'\u0300', '\u0301'}
+
+
+def normalize(text):
+    """Case-fold text and smooth out Ukrainian/Russian spelling variants."""
+    if not text:
+        return ''
+    text = unicodedata.normalize('NFD', text)
+    text = ''.join(ch for ch in text if ch not in _STRESS_MARKS)
+    text = unicodedata.normalize('NFC', text).casefold()
+    # м'ята == мʼята == мята, ё == е
+    text = _APOSTROPHES.sub('', text)
+    return text.replace('ё', 'е')
+
+
+def tokenize(text):
+    return _TOKEN.findall(normalize(text))
+
+
+def backend():
+    if connection.vendor == 'sqlite':
+        return 'sqlite'
+    if connection.vendor == 'postgresql':
+        return 'postgresql'
+    return None
+
+
+def _sqlite_match(tokens):
+    # Every term is a prefix so that search-as-you-type works
+    return ' '.join('"%s"*' % token for token in tokens)
+
+
+def _pg_tsquery(tokens):
+    return ' & '.join('%s:*' % token for token in tokens)
+
+
+def search_listings(queryset, query):
+    """Restrict queryset to listings matching query and annotate ``search_rank``.
+
+    A higher ``search_rank`` means a more relevant listing.
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return queryset
+
+    engine = backend()
+    if engine == 'sqlite':
+        return queryset.extra(
+            tables=[FTS_TABLE],
+            where=[
+                '%s.rowid = books_booklisting.id' % FTS_TABLE,
+                '%s MATCH %%s' % FTS_TABLE,
+            ],
+            params=[_sqlite_match(tokens)],
+            select={'search_rank': '-bm25(%s, %s)' % (FTS_TABLE, ', '.join(map(str, SQLITE_WEIGHTS)))},
+        )
+    if engine == 'postgresql':
+        tsquery = _pg_tsquery(tokens)
+        return queryset.extra(
+            tables=[TSV_TABLE],
+            where=[
+                '%s.listing_id = books_booklisting.id' % TSV_TABLE,
+                "%s.document @@ to_tsquery('simple', %%s)" % TSV_TABLE,
+            ],
+            params=[tsquery],
+            select={'search_rank': "ts_rank_cd(%s.document, to_tsquery('simple', %%s))" % TSV_TABLE},
+            select_params=[tsquery],
+        )
+
+    # Other databases have no index, fall back to a plain scan
+    condition = Q()
+    for token in tokens:
+        condition &= (
+            Q(title__icontains=token) | Q(author__icontains=token) | Q(description__icontains=token)
+        )
+    return queryset.filter(condition).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+def is_ranked(queryset):
+    query = queryset.query
+    return 'search_rank' in query.extra_select or 'search_rank' in query.annotations
+
+
+def index_listings(listings):
+    """Insert or refresh the search documents of the given listings."""
+    rows = [
+        (listing.id, normalize(listing.title), normalize(listing.author), normalize(listing.description))
+        for listing in listings
+    ]
+    if not rows:
+        return
+
+    engine = backend()
+    with connection.cursor() as cursor:
+        if engine == 'sqlite':
+            cursor.executemany(
+                'DELETE FROM %s WHERE rowid = %%s' % FTS_TABLE,
+                [(row[0],) for row in rows],
+            )
+            cursor.executemany(
+                'INSERT INTO %s (rowid, title, author, description) VALUES (%%s, %%s, %%s, %%s)' % FTS_TABLE,
+                rows,
+            )
+        elif engine == 'postgresql':
+            cursor.executemany(
+                "INSERT INTO %s (listing_id, document) VALUES (%%s, "
+                "setweight(to_tsvector('simple', %%s), 'A') || "
+                "setweight(to_tsvector('simple', %%s), 'B') || "
+                "setweight(to_tsvector('simple', %%s), 'C')) "
+                "ON CONFLICT (listing_id) DO UPDATE SET document = EXCLUDED.document" % TSV_TABLE,
+                rows,
+            )
+
+
+def index_listing(listing):
+    index_listings([listing])
+
+
+def remove_listing(listing_id):
+    engine = backend()
+    with connection.cursor() as cursor:
+        if engine == 'sqlite':
+            cursor.execute('DELETE FROM %s WHERE rowid = %%s' % FTS_TABLE, [listing_id])
+        elif engine == 'postgresql':
+            cursor.execute('DELETE FROM %s WHERE listing_id = %%s' % TSV_TABLE, [listing_id])
+
+
+def rebuild_index(batch_size=2000):
+    engine = backend()
+    with connection.cursor() as cursor:
+        if engine == 'sqlite':
+            cursor.execute('DELETE FROM %s' % FTS_TABLE)
+        elif engine == 'postgresql':
+            cursor.execute('TRUNCATE %s' % TSV_TABLE)
+
+    batch = []
+    total = 0
+    listings = BookListing.objects.only('id', 'title', 'author', 'description').order_by('id')
+    for listing in listings.iterator(chunk_size=batch_size):
+        batch.append(listing)
+        if len(batch) >= batch_size:
+            index_listings(batch)
+            total += len(batch)
+            batch = []
+    index_listings(batch)
+    return total + len(batch)
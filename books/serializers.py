@@ -1,8 +1,10 @@
 from rest_framework import serializers
 from .models import BookListing, Category, Genre, Transaction
 from media.models import Photo  # Импортируем модель Photo
+from media.serializers import PhotoSerializer
 from users.serializers import UserSerializer
 from .models import Favorite
+from .loaders import favorited_ids
 
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
@@ -14,11 +16,6 @@ class GenreSerializer(serializers.ModelSerializer):
         model = Genre
         fields = ['id', 'name']  # Явно указываем поля
 
-class PhotoSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Photo
-        fields = ['id', 'image']  # Для отображения URL фото
-
 
 class BookTransactionSerializer(serializers.ModelSerializer):
     class Meta:
@@ -38,6 +35,43 @@ class TransactionSerializer(serializers.ModelSerializer):
             'updated_at', 'seller_confirmation_deadline', 'buyer_confirmation_deadline'
         ]
 
+class TotalsSerializer(serializers.Serializer):
+    count = serializers.IntegerField()
+    gross = serializers.DecimalField(max_digits=14, decimal_places=2)
+    commission = serializers.DecimalField(max_digits=14, decimal_places=2)
+    net = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+class DailyTotalsSerializer(TotalsSerializer):
+    day = serializers.DateField()
+
+class SellerDashboardSerializer(serializers.Serializer):
+    date_from = serializers.DateField()
+    date_to = serializers.DateField()
+    sales = TotalsSerializer()
+    paid_out_net = serializers.DecimalField(max_digits=14, decimal_places=2)
+    pending_net = serializers.DecimalField(max_digits=14, decimal_places=2)
+    by_status = serializers.DictField(child=TotalsSerializer())
+    daily = DailyTotalsSerializer(many=True)
+
+def is_favorited(serializer, obj):
+    # List serializers resolve the favorites of a whole page at once
+    favorited = serializer.context.get('favorited_ids')
+    if favorited is not None:
+        return obj.pk in favorited
+    request = serializer.context.get('request')
+    if request and request.user.is_authenticated:
+        return Favorite.objects.filter(user=request.user, book_listing=obj).exists()
+    return False
+
+class BookListingListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        listings = list(data.all() if hasattr(data, 'all') else data)
+        request = self.context.get('request')
+        self.context['favorited_ids'] = favorited_ids(
+            getattr(request, 'user', None), [listing.pk for listing in listings]
+        )
+        return super().to_representation(listings)
+
 class BookDetailSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     photo_detail = PhotoSerializer(source='photo', read_only=True)
@@ -56,10 +90,7 @@ class BookDetailSerializer(serializers.ModelSerializer):
         ]
 
     def get_is_favorited(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return Favorite.objects.filter(user=request.user, book_listing=obj).exists()
-        return False
+        return is_favorited(self, obj)
 
 class BookListingSerializer(serializers.ModelSerializer):
     photo = serializers.PrimaryKeyRelatedField(queryset=Photo.objects.all(), write_only=True)
@@ -85,13 +116,21 @@ class BookListingSerializer(serializers.ModelSerializer):
             'created_at', 'location', 'condition', 'is_sold', 'transactions', 'is_favorited'
         ]
         read_only_fields = ['user', 'created_at', 'location', 'is_sold', 'transactions']
+        list_serializer_class = BookListingListSerializer
 
     def get_is_favorited(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return Favorite.objects.filter(user=request.user, book_listing=obj).exists()
-        return False
+        return is_favorited(self, obj)
     
+class FavoriteListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        favorites = list(data.all() if hasattr(data, 'all') else data)
+        request = self.context.get('request')
+        user_id = getattr(getattr(request, 'user', None), 'pk', None)
+        self.context['favorited_ids'] = {
+            favorite.book_listing_id for favorite in favorites if favorite.user_id == user_id
+        }
+        return super().to_representation(favorites)
+
 class FavoriteSerializer(serializers.ModelSerializer):
     book_listing = BookListingSerializer(read_only=True)
     book_listing_id = serializers.PrimaryKeyRelatedField(
@@ -101,4 +140,5 @@ class FavoriteSerializer(serializers.ModelSerializer):
     class Meta:
         model = Favorite
         fields = ['id', 'user', 'book_listing', 'book_listing_id', 'created_at']
-        read_only_fields = ['user', 'created_at']
\ No newline at end of file
+        read_only_fields = ['user', 'created_at']
+        list_serializer_class = FavoriteListSerializer
\ No newline at end of file
@@ -0,0 +1,70 @@
+# books/signals.py
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from media.models import Photo
+
+from . import ledger, search
+from .cache import bump_catalog_version
+from .models import BookListing, Category, Genre, Transaction, lookup_key, transaction_transitioned
+
+
+@receiver(post_save, sender=BookListing)
+def index_book_listing(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    search.index_listing(instance)
+
+
+@receiver(post_delete, sender=BookListing)
+def unindex_book_listing(sender, instance, **kwargs):
+    search.remove_listing(instance.pk)
+
+
+@receiver(post_save, sender=BookListing)
+@receiver(post_delete, sender=BookListing)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+@receiver(post_save, sender=Photo)
+@receiver(post_delete, sender=Photo)
+def invalidate_catalog_cache(sender, raw=False, **kwargs):
+    if raw:
+        return
+    bump_catalog_version()
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def sync_seller_region(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw or created:
+        return
+    if update_fields is not None and 'region' not in update_fields:
+        return
+    region = lookup_key(instance.region)
+    updated = (
+        BookListing.objects.filter(user=instance)
+        .exclude(seller_region=region)
+        .update(seller_region=region, updated_at=timezone.now())
+    )
+    if updated:
+        bump_catalog_version()
+
+
+@receiver(transaction_transitioned, sender=Transaction)
+def update_seller_totals(sender, rows, target, **kwargs):
+    ledger.record_transition(rows, target)
+
+
+@receiver(post_save, sender=Transaction)
+def add_seller_totals(sender, instance, created, raw=False, **kwargs):
+    if raw or not created:
+        return
+    ledger.record_added(ledger.transaction_row(instance))
+
+
+@receiver(post_delete, sender=Transaction)
+def remove_seller_totals(sender, instance, **kwargs):
+    ledger.record_removed(ledger.transaction_row(instance))
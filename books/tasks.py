@@ -1,14 +1,182 @@
 # books/tasks.py
+import logging
+import time
+
 from celery import shared_task
+from django.conf import settings
 from django.utils import timezone
-from .models import Transaction
+from . import ledger
+from .cache import bump_catalog_version
+from .models import BookListing, Transaction
+from .payments import PaymentDeclined, PaymentError, get_gateway
+from .refunds import claim_expired_transactions, refund_transactions
+from .reservations import hold_listing, release_reservation
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def auto_complete_transactions(batch_size=None, time_budget=None):
+    # Drains overdue SELLER_CONFIRMED transactions in short conditional UPDATEs,
+    # so a large backlog never holds long locks or gets loaded into memory
+    batch_size = batch_size or settings.TRANSACTION_SWEEP_BATCH_SIZE
+    time_budget = time_budget or settings.TRANSACTION_SWEEP_TIME_BUDGET_SECONDS
+    started = time.monotonic()
+    now = timezone.now()
+    completed = 0
+    batches = 0
+    drained = False
+
+    while time.monotonic() - started < time_budget:
+        ids = list(
+            Transaction.objects.filter(status='SELLER_CONFIRMED', buyer_confirmation_deadline__lte=now)
+            .order_by('buyer_confirmation_deadline')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            drained = True
+            break
+        completed += Transaction.objects.filter(id__in=ids).transition('SELLER_CONFIRMED', 'COMPLETED')
+        batches += 1
+        if len(ids) < batch_size:
+            drained = True
+            break
+
+    duration = time.monotonic() - started
+    logger.info(
+        "auto_complete_transactions: completed=%s batches=%s duration=%.3fs drained=%s",
+        completed, batches, duration, drained,
+    )
+    return {'completed': completed, 'batches': batches, 'duration': round(duration, 3), 'drained': drained}
+
+
+@shared_task
+def refund_expired_transactions(batch_size=None, time_budget=None):
+    # Refunds PAID transactions the seller did not confirm before the deadline
+    batch_size = batch_size or settings.TRANSACTION_REFUND_BATCH_SIZE
+    time_budget = time_budget or settings.TRANSACTION_SWEEP_TIME_BUDGET_SECONDS
+    started = time.monotonic()
+    now = timezone.now()
+    totals = {'REFUNDED': 0, 'RETRY': 0, 'FAILED': 0}
+    batches = 0
+    drained = False
+
+    while time.monotonic() - started < time_budget:
+        selected, claimed = claim_expired_transactions(batch_size, now)
+        if not selected:
+            drained = True
+            break
+        # Empty when a concurrent sweep won the whole batch; more rows may remain
+        for refund_status, count in refund_transactions(claimed).items():
+            totals[refund_status] += count
+        batches += 1
+
+    duration = time.monotonic() - started
+    logger.info(
+        "refund_expired_transactions: refunded=%s retry=%s failed=%s batches=%s duration=%.3fs drained=%s",
+        totals['REFUNDED'], totals['RETRY'], totals['FAILED'], batches, duration, drained,
+    )
+    return {
+        'refunded': totals['REFUNDED'], 'retry': totals['RETRY'], 'failed': totals['FAILED'],
+        'batches': batches, 'duration': round(duration, 3), 'drained': drained,
+    }
+
 
 @shared_task
-def auto_complete_transactions():
-    transactions = Transaction.objects.filter(
-        status='SELLER_CONFIRMED',
-        buyer_confirmation_deadline__lte=timezone.now()
-    )
-    for transaction in transactions:
-        transaction.status = 'COMPLETED'
-        transaction.save()
\ No newline at end of file
+def reconcile_seller_totals():
+    # Recomputes the dashboard aggregates from the transactions to repair any drift
+    started = time.monotonic()
+    rows = ledger.reconcile()
+    duration = time.monotonic() - started
+    logger.info("reconcile_seller_totals: rows=%s duration=%.3fs", rows, duration)
+    return {'rows': rows, 'duration': round(duration, 3)}
+
+
+def schedule_expired_refunds():
+    # The periodic sweep refunds the transaction anyway if the broker is unavailable
+    try:
+        refund_expired_transactions.apply_async(retry=False, ignore_result=True)
+    except Exception:
+        logger.warning("Could not queue expired transaction refunds", exc_info=True)
+
+
+def payment_retry_countdown(task):
+    if task.request.called_directly or task.request.retries >= settings.PAYMENT_TASK_MAX_RETRIES:
+        return None
+    return settings.PAYMENT_TASK_RETRY_DELAY_SECONDS * 2 ** task.request.retries
+
+
+@shared_task(bind=True, max_retries=None)
+def create_transaction_payment(self, transaction_id):
+    tx = (
+        Transaction.objects.select_related('book')
+        .filter(id=transaction_id, status='PENDING', paypal_transaction_id__isnull=True)
+        .first()
+    )
+    if tx is None:
+        return
+    book_url = "http://localhost:5173/book/" + str(tx.book_id)  # Redirect to frontend
+    try:
+        payment_id, approval_url = get_gateway().create_payment(
+            tx.amount, f"Покупка книги: {tx.book.title}", book_url, book_url + "?cancelled=true"
+        )
+    except PaymentError as error:
+        countdown = None if isinstance(error, PaymentDeclined) else payment_retry_countdown(self)
+        if countdown is not None:
+            raise self.retry(exc=error, countdown=countdown)
+        error = error.error if isinstance(error, PaymentDeclined) else error
+        if tx.transition('PENDING', 'CANCELLED', payment_error=str(error)):
+            release_reservation(tx.book_id, tx.buyer_id)
+        return
+    Transaction.objects.filter(id=tx.id).update(
+        paypal_transaction_id=payment_id, approval_url=approval_url, updated_at=timezone.now()
+    )
+
+
+@shared_task(bind=True, max_retries=None)
+def execute_transaction_payment(self, transaction_id, payer_id):
+    tx = Transaction.objects.filter(id=transaction_id, status='PENDING').first()
+    if tx is None or not tx.paypal_transaction_id:
+        return
+    # The hold may have lapsed while the buyer was on PayPal; never charge for a listing someone else holds
+    if not hold_listing(tx.book_id, tx.buyer_id):
+        tx.transition('PENDING', 'CANCELLED', payment_error="Книга зарезервирована другим покупателем")
+        return
+    try:
+        get_gateway().execute_payment(tx.paypal_transaction_id, payer_id, request_id=f'execute-{tx.id}')
+    except PaymentDeclined as error:
+        if tx.transition('PENDING', 'CANCELLED', payment_error=str(error.error)):
+            release_reservation(tx.book_id, tx.buyer_id)
+        return
+    except PaymentError as error:
+        countdown = payment_retry_countdown(self)
+        if countdown is not None:
+            raise self.retry(exc=error, countdown=countdown)
+        # The outcome is unknown, let the buyer try again
+        Transaction.objects.filter(id=tx.id, status='PENDING').update(
+            execute_requested_at=None, payment_error=str(error), updated_at=timezone.now()
+        )
+        return
+    if not tx.transition('PENDING', 'PAID', payment_error=''):
+        logger.error("Payment %s was executed but transaction %s is no longer pending", tx.paypal_transaction_id, tx.id)
+        return
+    BookListing.objects.filter(id=tx.book_id).update(is_sold=True, updated_at=tx.updated_at)
+    bump_catalog_version()
+
+
+def run_payment_task(task, *args):
+    """Queue a payment task, or run it inline when queueing is off or the broker is down.
+
+    Returns True if the task was queued.
+    """
+    if settings.PAYMENT_GATEWAY_QUEUED:
+        try:
+            # Fail fast when the broker is down: the default publish retries and the
+            # result backend's reconnects would hold the request for ~20 seconds.
+            # Nothing reads the results of these tasks.
+            task.apply_async(args, retry=False, ignore_result=True)
+            return True
+        except Exception:
+            logger.warning("Could not queue %s, running it inline", task.name, exc_info=True)
+    task(*args)
+    return False
@@ -1,3 +1,496 @@
-from django.test import TestCase
+import base64
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
 
-# Create your tests here.
+import requests
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import Q
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from users.models import CustomUser
+
+from . import ledger, refunds
+from .cache import catalog_version, get_cache as get_catalog_cache
+from .importers import MAX_REPORTED_ERRORS
+from .models import BookListing, SellerDailyTotals, Transaction, TransactionQuerySet, transaction_transitioned
+from .payments import FakePaymentBackend, PooledApi, get_gateway, reset_gateway
+from .reservations import hold_listing
+from .tasks import execute_transaction_payment, refund_expired_transactions
+
+
+def make_user(email):
+    return CustomUser.objects.create_user(email=email, password=None, first_name='Test', last_name='User')
+
+
+def make_transaction(seller, buyer, status='PENDING', amount='100.00'):
+    book = BookListing.objects.create(user=seller, title='Book', description='Description', price=Decimal(amount))
+    return Transaction.objects.create(
+        book=book, buyer=buyer, seller=seller, amount=Decimal(amount),
+        platform_commission=Decimal(amount) * Decimal('0.05'), seller_amount=Decimal(amount) * Decimal('0.95'),
+        status=status,
+    )
+
+
+@override_settings(PAYMENT_GATEWAY_BACKEND='books.payments.PayPalBackend', PAYMENT_GATEWAY_QUEUED=False)
+class ExecutePaymentRetryTests(TestCase):
+    def setUp(self):
+        reset_gateway()
+        self.addCleanup(reset_gateway)
+        self.buyer = make_user('buyer@example.com')
+        self.tx = make_transaction(make_user('seller@example.com'), self.buyer)
+        Transaction.objects.filter(id=self.tx.id).update(paypal_transaction_id='PAY-1')
+        hold_listing(self.tx.book_id, self.buyer.id)
+
+    def execute(self, post_responses, get_response=None):
+        """Run the task twice against PayPal answers; returns the request ids sent."""
+        with mock.patch.object(PooledApi, 'post', side_effect=post_responses) as post, \
+                mock.patch.object(PooledApi, 'get', return_value=get_response or {}):
+            execute_transaction_payment(self.tx.id, 'PAYER')
+            self.tx.refresh_from_db()
+            self.assertEqual(self.tx.status, 'PENDING')
+            execute_transaction_payment(self.tx.id, 'PAYER')
+        self.tx.refresh_from_db()
+        return [call.args[2]['PayPal-Request-Id'] for call in post.call_args_list]
+
+    def test_timeout_then_already_done_marks_paid(self):
+        request_ids = self.execute([
+            requests.Timeout('read timed out'),
+            {'error': {'name': 'PAYMENT_ALREADY_DONE', 'message': 'Payment has been done already'}},
+        ])
+        self.assertEqual(request_ids, [f'execute-{self.tx.id}'] * 2)
+        self.assertEqual(self.tx.status, 'PAID')
+        self.assertTrue(BookListing.objects.get(id=self.tx.book_id).is_sold)
+
+    def test_timeout_then_decline_of_approved_payment_marks_paid(self):
+        self.execute(
+            [requests.Timeout('read timed out'), {'error': {'name': 'PAYMENT_STATE_INVALID', 'message': 'Invalid'}}],
+            get_response={'id': 'PAY-1', 'state': 'approved'},
+        )
+        self.assertEqual(self.tx.status, 'PAID')
+
+    def test_timeout_then_decline_of_failed_payment_cancels(self):
+        self.execute(
+            [requests.Timeout('read timed out'), {'error': {'name': 'INSTRUMENT_DECLINED', 'message': 'Declined'}}],
+            get_response={'id': 'PAY-1', 'state': 'failed'},
+        )
+        self.assertEqual(self.tx.status, 'CANCELLED')
+        self.assertIsNone(BookListing.objects.get(id=self.tx.book_id).reserved_by_id)
+
+
+class TransitionTests(TestCase):
+    def setUp(self):
+        self.seller = make_user('seller@example.com')
+        self.buyer = make_user('buyer@example.com')
+        self.moved = []
+        handler = lambda sender, rows, target, **kwargs: self.moved.extend((row['id'], target) for row in rows)
+        transaction_transitioned.connect(handler, sender=Transaction, weak=False)
+        self.addCleanup(transaction_transitioned.disconnect, handler, sender=Transaction)
+
+    def test_queryset_transition_skips_rows_moved_by_another_writer(self):
+        winner = make_transaction(self.seller, self.buyer, status='PAID')
+        loser = make_transaction(self.seller, self.buyer, status='PAID')
+        values = TransactionQuerySet.values
+
+        def values_then_race(queryset, *fields):
+            rows = list(values(queryset, *fields))
+            # Another writer cancels one candidate between the select and the update
+            Transaction.objects.filter(id=loser.id).update(status='CANCELLED')
+            return rows
+
+        with mock.patch.object(TransactionQuerySet, 'values', values_then_race):
+            moved = Transaction.objects.filter(id__in=[winner.id, loser.id]).transition('PAID', 'SELLER_CONFIRMED')
+
+        self.assertEqual(moved, 1)
+        self.assertEqual(self.moved, [(winner.id, 'SELLER_CONFIRMED')])
+        self.assertEqual(Transaction.objects.get(id=winner.id).status, 'SELLER_CONFIRMED')
+        self.assertEqual(Transaction.objects.get(id=loser.id).status, 'CANCELLED')
+
+    def test_queryset_transition_without_candidates(self):
+        tx = make_transaction(self.seller, self.buyer, status='COMPLETED')
+        self.assertEqual(Transaction.objects.filter(id=tx.id).transition('PAID', 'CANCELLED'), 0)
+        self.assertEqual(self.moved, [])
+
+    def test_instance_transition_condition_miss(self):
+        tx = make_transaction(self.seller, self.buyer, status='PAID')
+        Transaction.objects.filter(id=tx.id).update(refund_status='PROCESSING')
+
+        self.assertFalse(tx.transition('PAID', 'SELLER_CONFIRMED', condition=Q(refund_status='')))
+        self.assertEqual(tx.status, 'PAID')
+        self.assertEqual(Transaction.objects.get(id=tx.id).status, 'PAID')
+        self.assertEqual(self.moved, [])
+
+    def test_instance_transition_lost_race(self):
+        tx = make_transaction(self.seller, self.buyer, status='SELLER_CONFIRMED')
+        Transaction.objects.filter(id=tx.id).update(status='COMPLETED')
+
+        self.assertFalse(tx.transition('SELLER_CONFIRMED', 'DISPUTED'))
+        self.assertEqual(tx.status, 'SELLER_CONFIRMED')
+        self.assertEqual(Transaction.objects.get(id=tx.id).status, 'COMPLETED')
+
+    def test_instance_transition_updates_instance(self):
+        tx = make_transaction(self.seller, self.buyer, status='PENDING')
+
+        self.assertTrue(tx.transition('PENDING', 'PAID', payment_error=''))
+        self.assertEqual(tx.status, 'PAID')
+        self.assertEqual(self.moved, [(tx.id, 'PAID')])
+
+    def test_invalid_edge_raises(self):
+        tx = make_transaction(self.seller, self.buyer, status='COMPLETED')
+        with self.assertRaises(ValueError):
+            tx.transition('COMPLETED', 'PAID')
+        with self.assertRaises(ValueError):
+            Transaction.objects.filter(id=tx.id).transition(['PAID', 'COMPLETED'], 'CANCELLED')
+        self.assertEqual(Transaction.objects.get(id=tx.id).status, 'COMPLETED')
+
+
+class LedgerTests(TestCase):
+    def setUp(self):
+        self.seller = make_user('seller@example.com')
+        self.buyer = make_user('buyer@example.com')
+
+    def totals(self):
+        return {
+            row.status: (row.count, row.gross, row.commission, row.net)
+            for row in SellerDailyTotals.objects.filter(seller=self.seller).exclude(count=0)
+        }
+
+    def test_transitions_move_totals_between_statuses(self):
+        tx = make_transaction(self.seller, self.buyer, amount='100.00')
+        other = make_transaction(self.seller, self.buyer, amount='40.00')
+        self.assertEqual(self.totals(), {'PENDING': (2, Decimal('140.00'), Decimal('7.00'), Decimal('133.00'))})
+
+        tx.transition('PENDING', 'PAID')
+        Transaction.objects.filter(id=other.id).transition('PENDING', 'CANCELLED')
+        self.assertEqual(self.totals(), {
+            'PAID': (1, Decimal('100.00'), Decimal('5.00'), Decimal('95.00')),
+            'CANCELLED': (1, Decimal('40.00'), Decimal('2.00'), Decimal('38.00')),
+        })
+
+    def test_failed_transition_leaves_totals(self):
+        tx = make_transaction(self.seller, self.buyer, status='PAID')
+        Transaction.objects.filter(id=tx.id).update(status='CANCELLED')
+        before = self.totals()
+
+        self.assertFalse(tx.transition('PAID', 'SELLER_CONFIRMED'))
+        self.assertEqual(self.totals(), before)
+
+    def test_incremental_totals_match_reconcile(self):
+        txs = [make_transaction(self.seller, self.buyer, status='PAID', amount=f'{10 * i}.00') for i in range(1, 5)]
+        Transaction.objects.filter(id__in=[tx.id for tx in txs[:3]]).transition('PAID', 'SELLER_CONFIRMED')
+        txs[0].refresh_from_db()
+        txs[0].transition('SELLER_CONFIRMED', 'COMPLETED')
+        txs[3].delete()
+        incremental = self.totals()
+
+        ledger.reconcile()
+        self.assertEqual(self.totals(), incremental)
+
+    def test_reconcile_repairs_rows_in_place(self):
+        paid = make_transaction(self.seller, self.buyer, status='PAID', amount='100.00')
+        make_transaction(self.seller, self.buyer, status='PENDING', amount='40.00')
+        expected = self.totals()
+        kept = SellerDailyTotals.objects.get(seller=self.seller, status='PENDING')
+        # Drift: a wrong count, a missing row and a row for no transactions
+        SellerDailyTotals.objects.filter(seller=self.seller, status='PENDING').update(count=7)
+        SellerDailyTotals.objects.filter(seller=self.seller, status='PAID').delete()
+        SellerDailyTotals.objects.create(seller=self.seller, day=paid.created_at.date(), status='DISPUTED', count=1)
+
+        self.assertEqual(ledger.reconcile(), 3)
+        self.assertEqual(self.totals(), expected)
+        # Updated, not deleted and reinserted, so concurrent deltas still find it
+        self.assertEqual(SellerDailyTotals.objects.get(seller=self.seller, status='PENDING').id, kept.id)
+        self.assertEqual(ledger.reconcile(), 0)
+
+    def test_dashboard_sums_sold_statuses(self):
+        paid = make_transaction(self.seller, self.buyer, status='PAID', amount='100.00')
+        make_transaction(self.seller, self.buyer, status='PENDING', amount='50.00')
+        paid.transition('PAID', 'SELLER_CONFIRMED')
+        today = paid.created_at.date()
+
+        dashboard = ledger.seller_dashboard(self.seller, today, today)
+        self.assertEqual(dashboard['sales']['count'], 1)
+        self.assertEqual(dashboard['sales']['net'], Decimal('95.00'))
+        self.assertEqual(dashboard['by_status']['PENDING']['count'], 1)
+
+
+class ImpossibleDateTests(TestCase):
+    def test_export_rejects_impossible_date(self):
+        response = self.client.get('/api/books/book-listings/export/', {'updated_since': '2024-02-30'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'Неверный формат updated_since'})
+
+    def test_history_rejects_impossible_date(self):
+        client = APIClient()
+        client.force_authenticate(make_user('seller@example.com'))
+        response = client.get('/api/books/seller/transactions/', {'created_after': '2024-13-01T00:00'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'Неверный формат created_after'})
+
+    def test_export_command_rejects_impossible_date(self):
+        with self.assertRaises(CommandError):
+            call_command('export_listings', updated_since='2024-02-30')
+
+
+@override_settings(PAYMENT_GATEWAY_BACKEND='books.payments.FakePaymentBackend', PAYMENT_GATEWAY_QUEUED=False)
+class ConcurrentInitiateTests(TransactionTestCase):
+    buyers = 50
+
+    def setUp(self):
+        reset_gateway()
+        self.addCleanup(reset_gateway)
+        self.book = BookListing.objects.create(
+            user=make_user('seller@example.com'), title='Book', description='Description', price=Decimal('10.00'),
+        )
+        self.buyer_list = [make_user(f'buyer{i}@example.com') for i in range(self.buyers)]
+
+    def initiate(self, buyer, barrier):
+        client = APIClient()
+        client.force_authenticate(buyer)
+        barrier.wait()
+        try:
+            return client.post(f'/api/books/book/{self.book.id}/payment/initiate/')
+        finally:
+            connection.close()
+
+    def test_one_payment_for_concurrent_buyers(self):
+        barrier = threading.Barrier(self.buyers)
+        with mock.patch.object(FakePaymentBackend, 'create_payment', autospec=True,
+                               side_effect=FakePaymentBackend.create_payment) as create_payment:
+            with ThreadPoolExecutor(max_workers=self.buyers) as pool:
+                responses = list(pool.map(lambda buyer: self.initiate(buyer, barrier), self.buyer_list))
+
+        codes = sorted(response.status_code for response in responses)
+        self.assertEqual(codes, [200] + [409] * (self.buyers - 1))
+        for response in responses:
+            if response.status_code == 409:
+                self.assertEqual(response.data, {"error": "Книга зарезервирована другим покупателем"})
+        self.assertEqual(create_payment.call_count, 1)
+        self.assertEqual(Transaction.objects.filter(book=self.book).count(), 1)
+        self.assertEqual(Transaction.objects.get(book=self.book).status, 'PENDING')
+
+
+class KeysetPaginationTests(TestCase):
+    url = '/api/books/book-listings/all/'
+
+    def setUp(self):
+        self.seller = make_user('seller@example.com')
+        self.client = APIClient()
+        self.client.force_authenticate(make_user('reader@example.com'))
+        moment = timezone.now() - timedelta(days=1)
+        self.listings = []
+        for price, days in (('5.00', 0), ('5.00', 0), ('5.00', 1), ('7.00', 1), ('7.00', 0), ('3.00', 2)):
+            listing = self.create_listing(price)
+            # Equal timestamps must be told apart by id
+            BookListing.objects.filter(id=listing.id).update(created_at=moment - timedelta(days=days))
+            listing.refresh_from_db()
+            self.listings.append(listing)
+
+    def create_listing(self, price):
+        return BookListing.objects.create(user=self.seller, title='Book', description='Description', price=Decimal(price))
+
+    def walk(self, sort, items_per_page=2):
+        ids = []
+        response = self.client.get(self.url, {'pagination': 'cursor', 'sort': sort, 'items_per_page': items_per_page})
+        # Bounded, so a cursor that never advances fails instead of looping
+        for _ in range(len(self.listings) + 1):
+            self.assertEqual(response.status_code, 200)
+            ids.extend(row['id'] for row in response.data['results'])
+            if response.data['next'] is None:
+                return ids
+            response = self.client.get(response.data['next'])
+        self.fail(f'Pagination by {sort} did not end')
+
+    def test_orders_with_equal_keys(self):
+        expected = {
+            'price_asc': sorted(self.listings, key=lambda listing: (listing.price, listing.id)),
+            'price_desc': sorted(self.listings, key=lambda listing: (listing.price, listing.id), reverse=True),
+            'newest': sorted(self.listings, key=lambda listing: (listing.created_at, listing.id), reverse=True),
+        }
+        for sort, listings in expected.items():
+            for items_per_page in (1, 2, 4):
+                with self.subTest(sort=sort, items_per_page=items_per_page):
+                    self.assertEqual(self.walk(sort, items_per_page), [listing.id for listing in listings])
+
+    def test_tampered_cursor_is_not_found(self):
+        response = self.client.get(self.url, {'pagination': 'cursor', 'sort': 'price_asc', 'items_per_page': 2})
+        cursor = parse_qs(urlparse(response.data['next']).query)['cursor'][0]
+        payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        tampered = [
+            'not-a-cursor!',
+            base64.urlsafe_b64encode(b'[1, 2]').decode(),
+            base64.urlsafe_b64encode(json.dumps(dict(payload, k='cheap')).encode()).decode(),
+            base64.urlsafe_b64encode(json.dumps(dict(payload, i='1 OR 1=1')).encode()).decode(),
+            # A cursor issued for another ordering
+            base64.urlsafe_b64encode(json.dumps(dict(payload, s='newest')).encode()).decode(),
+        ]
+        for value in tampered:
+            with self.subTest(cursor=value):
+                response = self.client.get(self.url, {'sort': 'price_asc', 'cursor': value})
+                self.assertEqual(response.status_code, 404)
+
+    def test_next_link_is_stable_while_rows_are_inserted(self):
+        first = self.client.get(self.url, {'pagination': 'cursor', 'sort': 'newest', 'items_per_page': 2})
+        seen = [row['id'] for row in first.data['results']]
+        # New listings sort ahead of the cursor and must not shift the next page
+        self.create_listing('1.00')
+        self.create_listing('9.00')
+
+        second = self.client.get(first.data['next'])
+        seen += [row['id'] for row in second.data['results']]
+        newest = sorted(self.listings, key=lambda listing: (listing.created_at, listing.id), reverse=True)
+        self.assertEqual(seen, [listing.id for listing in newest[:4]])
+
+
+@override_settings(PAYMENT_GATEWAY_BACKEND='books.payments.FakePaymentBackend', PAYMENT_GATEWAY_QUEUED=False)
+class CatalogCacheTests(TestCase):
+    url = '/api/books/book-listings/all/'
+
+    def setUp(self):
+        reset_gateway()
+        self.addCleanup(reset_gateway)
+        get_catalog_cache().clear()
+        self.addCleanup(get_catalog_cache().clear)
+        self.seller = make_user('seller@example.com')
+        self.buyer = make_user('buyer@example.com')
+        self.book = BookListing.objects.create(
+            user=self.seller, title='Old title', description='Description', price=Decimal('10.00'),
+        )
+
+    def listing(self):
+        response = self.client.get(self.url, {'items_per_page': 10})
+        self.assertEqual(response.status_code, 200)
+        return next(row for row in response.data['results'] if row['id'] == self.book.id)
+
+    def test_saving_a_listing_invalidates_cached_pages(self):
+        self.assertEqual(self.listing()['title'], 'Old title')
+        # Bypasses the signals, so the cached page is still served
+        BookListing.objects.filter(id=self.book.id).update(title='Unseen title')
+        self.assertEqual(self.listing()['title'], 'Old title')
+
+        version = catalog_version()
+        self.book.title = 'New title'
+        self.book.save()
+        self.assertGreater(catalog_version(), version)
+        self.assertEqual(self.listing()['title'], 'New title')
+
+    def test_selling_a_listing_invalidates_cached_pages(self):
+        self.assertFalse(self.listing()['is_sold'])
+        payment_id, _ = get_gateway().create_payment(Decimal('10.00'), 'Book', 'http://testserver/ok', 'http://testserver/no')
+        tx = make_transaction(self.seller, self.buyer)
+        Transaction.objects.filter(id=tx.id).update(book=self.book, paypal_transaction_id=payment_id)
+        hold_listing(self.book.id, self.buyer.id)
+
+        version = catalog_version()
+        execute_transaction_payment(tx.id, 'FAKEPAYER')
+        self.assertEqual(Transaction.objects.get(id=tx.id).status, 'PAID')
+        self.assertGreater(catalog_version(), version)
+        self.assertTrue(self.listing()['is_sold'])
+
+
+class ListingImportTests(TestCase):
+    url = '/api/books/import/'
+
+    def setUp(self):
+        self.user = make_user('seller@example.com')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self, name, content):
+        return self.client.post(self.url, {'file': SimpleUploadedFile(name, content)}, format='multipart')
+
+    def test_reports_bad_rows_and_imports_the_rest(self):
+        content = (
+            'title,description,price,condition\n'
+            'Good,Fine book,12.50,used\n'
+            ',No title,5,new\n'
+            'Cheap,Bad price,abc,new\n'
+            'Worn,Bad condition,3,torn\n'
+            'Also good,Another,"7,25",\n'
+        ).encode()
+
+        response = self.upload('listings.csv', content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(response.data['failed'], 3)
+        self.assertEqual([error['line'] for error in response.data['errors']], [3, 4, 5])
+        self.assertEqual(response.data['errors'][0]['error'], 'title: обязательное поле')
+        self.assertEqual(
+            sorted(BookListing.objects.filter(user=self.user).values_list('price', flat=True)),
+            [Decimal('7.25'), Decimal('12.50')],
+        )
+
+    def test_error_report_is_capped(self):
+        rows = [json.dumps({'title': 'Book', 'description': 'Bad', 'price': 'x'}) for _ in range(MAX_REPORTED_ERRORS + 5)]
+        rows.append(json.dumps({'title': 'Book', 'description': 'Good', 'price': '1'}))
+
+        response = self.upload('listings.jsonl', '\n'.join(rows).encode())
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(response.data['failed'], MAX_REPORTED_ERRORS + 5)
+        self.assertEqual(len(response.data['errors']), MAX_REPORTED_ERRORS)
+
+    def test_rejects_oversized_price(self):
+        content = b'title,description,price\nHuge,Book,1e30\nTop,Book,100000000\nMax,Book,99999999.99\n'
+
+        response = self.upload('listings.csv', content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(response.data['errors'], [
+            {'line': 2, 'error': 'price: слишком большое значение'},
+            {'line': 3, 'error': 'price: слишком большое значение'},
+        ])
+
+    @override_settings(LISTING_IMPORT_BATCH_SIZE=2)
+    def test_undecodable_file_reports_imported_rows(self):
+        # Large enough that the bad byte is decoded after the first batches are stored
+        good = ''.join(f'Book {i},Description,{i}\n' for i in range(2000)).encode()
+        content = b'title,description,price\n' + good + b'Broken,\xff\xfe,1\n'
+
+        response = self.upload('listings.csv', content)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(response.data['error'].startswith('Файл прочитан не полностью'))
+        self.assertGreater(response.data['created'], 0)
+        self.assertEqual(BookListing.objects.filter(user=self.user).count(), response.data['created'])
+
+
+class RefundSweepTests(TestCase):
+    def setUp(self):
+        seller, buyer = make_user('seller@example.com'), make_user('buyer@example.com')
+        self.txs = [make_transaction(seller, buyer, status='PAID') for _ in range(3)]
+        Transaction.objects.update(seller_confirmation_deadline=timezone.now() - timedelta(hours=1))
+
+    def test_keeps_going_when_a_concurrent_sweep_wins_a_batch(self):
+        expired_transactions = refunds.expired_transactions
+        calls = []
+
+        def racing_expired_transactions(now):
+            calls.append(now)
+            if len(calls) == 2:
+                # Between this sweep's select and its claim, another sweep claims the first row
+                Transaction.objects.filter(id=self.txs[0].id).update(refund_status='PROCESSING', updated_at=timezone.now())
+            return expired_transactions(now)
+
+        def refund(claimed):
+            Transaction.objects.filter(id__in=[tx.id for tx in claimed]).update(refund_status='REFUNDED')
+            return {'REFUNDED': len(claimed)}
+
+        with mock.patch.object(refunds, 'expired_transactions', racing_expired_transactions), \
+                mock.patch('books.tasks.refund_transactions', side_effect=refund):
+            result = refund_expired_transactions(batch_size=1)
+
+        self.assertEqual(result['refunded'], 2)
+        self.assertTrue(result['drained'])
+        self.assertEqual(Transaction.objects.filter(refund_status='REFUNDED').count(), 2)
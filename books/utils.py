@@ -1,10 +0,0 @@
-# books/utils.py
-import paypalrestsdk
-from django.conf import settings
-
-def configure_paypal():
-    paypalrestsdk.configure({
-        "mode": settings.PAYPAL_MODE,
-        "client_id": settings.PAYPAL_CLIENT_ID,
-        "client_secret": settings.PAYPAL_CLIENT_SECRET
-    })
\ No newline at end of file
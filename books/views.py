@@ -2,17 +2,33 @@
 from rest_framework import generics, permissions, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.parsers import MultiPartParser, FormParser
+from django.db import transaction as db_transaction
 from django.db.models import Q
+from django.http import StreamingHttpResponse
 from rest_framework.exceptions import PermissionDenied
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from datetime import timedelta
 from decimal import Decimal
-import paypalrestsdk
-from .models import BookListing, Transaction, Category, Genre
-from .serializers import BookListingSerializer, BookDetailSerializer, CategorySerializer, GenreSerializer, TransactionSerializer
-from .utils import configure_paypal
+from .models import BookListing, Transaction, Category, Genre, lookup_key
+from .serializers import BookListingSerializer, BookDetailSerializer, CategorySerializer, GenreSerializer, TransactionSerializer, SellerDashboardSerializer
+from .payments import get_gateway
+from .idempotency import idempotent
+from .ledger import default_period, seller_dashboard
+from .reservations import hold_listing, release_reservation
+from .tasks import create_transaction_payment, execute_transaction_payment, run_payment_task, schedule_expired_refunds
+from .search import is_ranked
+from .filters import filter_catalog, filter_transactions, parse_moment
+from .facets import catalog_facets
+from .pagination import KeysetPagination, TransactionHistoryPagination, cached_count
+from .loaders import with_listing_relations
+from .projections import LISTING_VALUES, render_listings
+from .importers import READ_ERRORS, ListingImporter, read_rows
+from .exporters import EXPORT_FORMATS, export_queryset, export_rows, render_export
+from .cache import catalog_cache_key, get_cached, set_cached, cache_stats
 from django.conf import settings
 from users.models import CustomUser
 from users.serializers import UserSerializer
@@ -35,6 +51,30 @@ class BookListingCreateView(generics.CreateAPIView):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class BookListingImportView(APIView):
+    permission_classes = [IsAuthenticated]
+    parser_classes = (MultiPartParser, FormParser)
+
+    def post(self, request):
+        file = request.FILES.get('file')
+        if not file:
+            return Response({"error": "Файл не передан"}, status=status.HTTP_400_BAD_REQUEST)
+        file_format = request.data.get('file_format')
+        if not file_format:
+            file_format = 'jsonl' if file.name.endswith(('.jsonl', '.ndjson')) else 'csv'
+        if file_format not in ('csv', 'jsonl'):
+            return Response({"error": "Поддерживаются только csv и jsonl"}, status=status.HTTP_400_BAD_REQUEST)
+
+        importer = ListingImporter(request.user)
+        try:
+            report = importer.run(read_rows(file, file_format))
+        except READ_ERRORS as error:
+            # Rows before the error are already imported; tell the client which ones
+            report = importer.report()
+            report['error'] = f"Файл прочитан не полностью: {error}"
+            return Response(report, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report, status=status.HTTP_200_OK)
+
 class BookListingUpdateView(generics.RetrieveUpdateAPIView):
     queryset = BookListing.objects.all()
     serializer_class = BookListingSerializer
@@ -54,6 +94,10 @@ class BookListingListView(generics.ListAPIView):
     def get_queryset(self):
         return BookListing.objects.filter(user=self.request.user)
 
+    def list(self, request, *args, **kwargs):
+        rows = self.get_queryset().values(*LISTING_VALUES)
+        return Response(render_listings(rows, request))
+
 class CategoryListView(generics.ListAPIView):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
@@ -81,82 +125,143 @@ class AllBookListingsView(APIView):
     permission_classes = [AllowAny]
 
     def get(self, request):
-        queryset = BookListing.objects.select_related('user').all()
-
-        search_query = request.query_params.get('search')
-        if search_query:
-            queryset = queryset.filter(
-                Q(title__icontains=search_query) |
-                Q(description__icontains=search_query)
-            )
-
-        city = request.query_params.get('city')
-        if city:
-            queryset = queryset.filter(user__region__iexact=city)
+        # Anonymous pages carry no per-user data (is_favorited), so they can be shared
+        if request.user.is_authenticated:
+            return self.list(request)
 
-        has_photo = request.query_params.get('has_photo')
-        if has_photo == 'true':
-            queryset = queryset.exclude(photo=None)
+        cache_key = catalog_cache_key('listings', request)
+        data = get_cached(cache_key)
+        if data is not None:
+            return Response(data)
 
-        condition = request.query_params.get('condition')
-        if condition:
-            queryset = queryset.filter(condition=condition)
+        response = self.list(request)
+        if response.status_code == status.HTTP_200_OK:
+            set_cached(cache_key, response.data)
+        return response
 
-        category = request.query_params.get('category')
-        if category:
-            queryset = queryset.filter(category__name__iexact=category)
-
-        genre_ids = request.query_params.get('genre_id')
-        if genre_ids:
-            id_list = [int(id.strip()) for id in genre_ids.split(',') if id.strip().isdigit()]
-            if id_list:
-                queryset = queryset.filter(genre__id__in=id_list)
+    def list(self, request):
+        queryset = filter_catalog(BookListing.objects.all(), request.query_params)
 
         sort_param = request.query_params.get('sort')
-        if sort_param == 'price_asc':
-            queryset = queryset.order_by('price')
+        use_cursor = (
+            request.query_params.get('pagination') == 'cursor'
+            or KeysetPagination.cursor_query_param in request.query_params
+        )
+        if use_cursor:
+            if sort_param == 'relevance':
+                return Response(
+                    {"error": "Курсорная пагинация не поддерживает сортировку по релевантности"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if sort_param not in KeysetPagination.orderings:
+                sort_param = 'newest'
+            paginator = KeysetPagination()
+            page = paginator.paginate_queryset(queryset.values(*LISTING_VALUES), request, sort_param)
+            count = None
+            if request.query_params.get('with_count') == 'true':
+                count = cached_count(queryset)
+            return paginator.get_paginated_response(render_listings(page, request, absolute_urls=False), count=count)
+
+        if sort_param == 'relevance' and is_ranked(queryset):
+            queryset = queryset.order_by('-search_rank', '-created_at')
+        elif sort_param == 'price_asc':
+            queryset = queryset.order_by('price', 'id')
         elif sort_param == 'price_desc':
-            queryset = queryset.order_by('-price')
+            queryset = queryset.order_by('-price', '-id')
         elif sort_param == 'newest':
-            queryset = queryset.order_by('-created_at')
+            queryset = queryset.order_by('-created_at', '-id')
         elif sort_param == 'oldest':
-            queryset = queryset.order_by('created_at')
+            queryset = queryset.order_by('created_at', 'id')
         else:
-            queryset = queryset.order_by('-created_at')
+            queryset = queryset.order_by('-created_at', '-id')
 
         paginator = CustomPagination()
-        paginated_qs = paginator.paginate_queryset(queryset, request)
-        serializer = BookListingSerializer(paginated_qs, many=True)
-        return paginator.get_paginated_response(serializer.data)
+        page = paginator.paginate_queryset(queryset.values(*LISTING_VALUES), request)
+        # Photo URLs stay relative, as this endpoint has always returned them
+        return paginator.get_paginated_response(render_listings(page, request, absolute_urls=False))
+
+class CatalogExportView(APIView):
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        export_format = request.query_params.get('export_format', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            return Response({"error": "Поддерживаются только ndjson и csv"}, status=status.HTTP_400_BAD_REQUEST)
+
+        updated_since = request.query_params.get('updated_since')
+        if updated_since:
+            updated_since = parse_moment(updated_since)
+            if updated_since is None:
+                return Response({"error": "Неверный формат updated_since"}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = export_queryset(BookListing.objects.all(), request.query_params, updated_since)
+        content_type = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+        response = StreamingHttpResponse(
+            render_export(export_rows(queryset, request), export_format),
+            content_type=f'{content_type}; charset=utf-8',
+        )
+        response['Content-Disposition'] = f'attachment; filename="listings.{export_format}"'
+        return response
+
+class CatalogFacetsView(APIView):
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        cache_key = catalog_cache_key('facets', request)
+        data = get_cached(cache_key)
+        if data is None:
+            data = catalog_facets(BookListing.objects.all(), request.query_params)
+            set_cached(cache_key, data, settings.CATALOG_FACETS_CACHE_SECONDS)
+        return Response(data)
+
+class CatalogCacheStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(cache_stats())
 
 class BookDetailView(generics.RetrieveAPIView):
-    queryset = BookListing.objects.all()
+    queryset = with_listing_relations(BookListing.objects.all())
     serializer_class = BookDetailSerializer
     lookup_field = 'id'
     permission_classes = [AllowAny]
 
+class UserListingsPagination(CustomPagination):
+    page_size = 20
+
 class UserBookListingsView(generics.ListAPIView):
     serializer_class = BookListingSerializer
     permission_classes = [AllowAny]
+    pagination_class = UserListingsPagination
 
     def get_queryset(self):
         user_id = self.kwargs.get('user_id')
-        return BookListing.objects.filter(user__id=user_id)
+        queryset = BookListing.objects.filter(user__id=user_id)
+        is_sold = self.request.query_params.get('is_sold')
+        if is_sold in ('true', 'false'):
+            queryset = queryset.filter(is_sold=is_sold == 'true')
+        return queryset.order_by('-created_at', '-id')
 
     def list(self, request, *args, **kwargs):
         user_id = self.kwargs.get('user_id')
         try:
-            user = CustomUser.objects.get(id=user_id)
+            user = CustomUser.objects.select_related('avatar').get(id=user_id)
         except CustomUser.DoesNotExist:
             return Response({"detail": "Пользователь не найден"}, status=status.HTTP_404_NOT_FOUND)
 
-        listings = self.get_queryset()
+        include_transactions = request.query_params.get('include_transactions') != 'false'
+        page = self.paginate_queryset(self.get_queryset().values(*LISTING_VALUES))
         user_data = UserSerializer(user).data
-        listings_data = BookListingSerializer(listings, many=True).data
+        listings_data = render_listings(
+            page, request, include_transactions=include_transactions, absolute_urls=False
+        )
 
         return Response({
             "user": user_data,
-            "listings": listings_data
+            "listings": listings_data,
+            "count": self.paginator.page.paginator.count,
+            "next": self.paginator.get_next_link(),
+            "previous": self.paginator.get_previous_link(),
         })
 
 class BookListingDeleteView(generics.DestroyAPIView):
@@ -175,9 +280,22 @@ class BookListingDeleteView(generics.DestroyAPIView):
 # books/views.py
 # ... other imports ...
 
+def payment_status_data(transaction):
+    return {
+        "transaction_id": transaction.id,
+        "status": transaction.status,
+        "approval_url": transaction.approval_url or None,
+        "error": transaction.payment_error or None,
+        # True while a gateway call for this transaction is still running
+        "processing": transaction.status == 'PENDING' and (
+            not transaction.approval_url or transaction.execute_requested_at is not None
+        ),
+    }
+
 class InitiatePaymentView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @idempotent
     def post(self, request, book_id):
         try:
             book = BookListing.objects.get(id=book_id)
@@ -190,54 +308,43 @@ class InitiatePaymentView(APIView):
         if book.user == request.user:
             return Response({"error": "Вы не можете купить собственную книгу"}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Calculate amounts
-        amount = book.price
-        commission = (Decimal(settings.PLATFORM_COMMISSION_PERCENT) / 100) * amount
-        seller_amount = amount - commission
-
-        # Create transaction
-        transaction = Transaction.objects.create(
-            book=book,
-            buyer=request.user,
-            seller=book.user,
-            amount=amount,
-            platform_commission=commission,
-            seller_amount=seller_amount,
-            status='PENDING',
-            seller_confirmation_deadline=timezone.now() + timedelta(hours=settings.SELLER_CONFIRMATION_HOURS)
-        )
+        with db_transaction.atomic():
+            # Only the buyer holding the listing may start or resume a payment
+            if not hold_listing(book.id, request.user.id):
+                return Response({"error": "Книга зарезервирована другим покупателем"}, status=status.HTTP_409_CONFLICT)
 
-        # Configure PayPal
-        configure_paypal()
-
-        # Create PayPal payment
-        payment = paypalrestsdk.Payment({
-            "intent": "sale",
-            "payer": {
-                "payment_method": "paypal"
-            },
-            "transactions": [{
-                "amount": {
-                    "total": str(amount),
-                    "currency": "USD"  # Adjust currency as needed
-                },
-                "description": f"Покупка книги: {book.title}"
-            }],
-            "redirect_urls": {
-                "return_url": "http://localhost:5173/book/" + str(book_id),  # Redirect to frontend
-                "cancel_url": "http://localhost:5173/book/" + str(book_id) + "?cancelled=true"
-            }
-        })
+            pending = (
+                Transaction.objects.filter(book=book, buyer=request.user, status='PENDING')
+                .order_by('-id').first()
+            )
+            if pending is not None:
+                response_status = status.HTTP_200_OK if pending.approval_url else status.HTTP_202_ACCEPTED
+                return Response(payment_status_data(pending), status=response_status)
+
+            # Calculate amounts
+            amount = book.price
+            commission = (Decimal(settings.PLATFORM_COMMISSION_PERCENT) / 100) * amount
+            seller_amount = amount - commission
+
+            # Create transaction
+            transaction = Transaction.objects.create(
+                book=book,
+                buyer=request.user,
+                seller=book.user,
+                amount=amount,
+                platform_commission=commission,
+                seller_amount=seller_amount,
+                status='PENDING',
+                seller_confirmation_deadline=timezone.now() + timedelta(hours=settings.SELLER_CONFIRMATION_HOURS)
+            )
 
-        if payment.create():
-            transaction.paypal_transaction_id = payment.id
-            transaction.save()
-            for link in payment.links:
-                if link.rel == "approval_url":
-                    return Response({"approval_url": link.href, "transaction_id": transaction.id}, status=status.HTTP_200_OK)
-        else:
-            transaction.delete()
-            return Response({"error": payment.error}, status=status.HTTP_400_BAD_REQUEST)
+        run_payment_task(create_transaction_payment, transaction.id)
+        transaction.refresh_from_db()
+        if transaction.status == 'CANCELLED':
+            return Response({"error": transaction.payment_error}, status=status.HTTP_400_BAD_REQUEST)
+        # Without an approval URL yet the client polls the payment status endpoint
+        response_status = status.HTTP_200_OK if transaction.approval_url else status.HTTP_202_ACCEPTED
+        return Response(payment_status_data(transaction), status=response_status)
 
 class ExecutePaymentView(APIView):
     permission_classes = [IsAuthenticated]
@@ -257,19 +364,36 @@ class ExecutePaymentView(APIView):
         if transaction.buyer != request.user:
             return Response({"error": "Недостаточно прав"}, status=status.HTTP_403_FORBIDDEN)
 
-        configure_paypal()
-        payment = paypalrestsdk.Payment.find(payment_id)
-
-        if payment.execute({"payer_id": payer_id}):
-            transaction.status = 'PAID'
-            transaction.book.is_sold = True
-            transaction.save()
-            transaction.book.save()
+        # Only the first request for a payment queues its execution
+        claimed = Transaction.objects.filter(
+            id=transaction.id, status='PENDING', execute_requested_at__isnull=True
+        ).update(execute_requested_at=timezone.now(), payment_error='')
+        if claimed:
+            run_payment_task(execute_transaction_payment, transaction.id, payer_id)
+
+        transaction.refresh_from_db()
+        if transaction.status == 'CANCELLED':
+            return Response({"error": transaction.payment_error or "Платеж отменен"}, status=status.HTTP_400_BAD_REQUEST)
+        if transaction.status != 'PENDING':
             return Response({"message": "Платеж успешно выполнен", "transaction_id": transaction.id}, status=status.HTTP_200_OK)
-        else:
-            transaction.status = 'CANCELLED'
-            transaction.save()
-            return Response({"error": payment.error}, status=status.HTTP_400_BAD_REQUEST)
+        if transaction.execute_requested_at is not None:
+            return Response({"message": "Платеж обрабатывается", **payment_status_data(transaction)}, status=status.HTTP_202_ACCEPTED)
+        return Response({"error": "Ошибка платежного сервиса, попробуйте позже"}, status=status.HTTP_502_BAD_GATEWAY)
+
+class PaymentStatusView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, transaction_id):
+        transaction = Transaction.objects.filter(id=transaction_id).only(
+            'id', 'buyer_id', 'status', 'approval_url', 'payment_error', 'execute_requested_at'
+        ).first()
+        if transaction is None:
+            return Response({"error": "Транзакция не найдена"}, status=status.HTTP_404_NOT_FOUND)
+
+        if transaction.buyer_id != request.user.id:
+            return Response({"error": "Недостаточно прав"}, status=status.HTTP_403_FORBIDDEN)
+
+        return Response(payment_status_data(transaction), status=status.HTTP_200_OK)
 
 class CancelPaymentView(APIView):
     permission_classes = [IsAuthenticated]
@@ -284,10 +408,18 @@ class CancelPaymentView(APIView):
         if transaction.buyer != request.user:
             return Response({"error": "Недостаточно прав"}, status=status.HTTP_403_FORBIDDEN)
 
-        transaction.status = 'CANCELLED'
-        transaction.save()
+        # A payment that is already being executed can no longer be cancelled
+        if not transaction.transition('PENDING', 'CANCELLED', condition=Q(execute_requested_at__isnull=True)):
+            return Response({"error": "Платеж уже нельзя отменить"}, status=status.HTTP_409_CONFLICT)
+        release_reservation(transaction.book_id, transaction.buyer_id)
         return Response({"message": "Платеж отменен"}, status=status.HTTP_200_OK)
 
+class PaymentGatewayStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(get_gateway().stats())
+
 class SellerConfirmShipmentView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -304,25 +436,19 @@ class SellerConfirmShipmentView(APIView):
             return Response({"error": "Транзакция не в статусе 'Оплачено'"}, status=status.HTTP_400_BAD_REQUEST)
 
         if timezone.now() > transaction.seller_confirmation_deadline:
-            # Auto-cancel and refund
-            configure_paypal()
-            try:
-                sale = paypalrestsdk.Sale.find(transaction.paypal_transaction_id)
-                refund = sale.refund({"amount": {"total": str(transaction.amount), "currency": "USD"}})
-                if refund.success():
-                    transaction.status = 'CANCELLED'
-                    transaction.book.is_sold = False
-                    transaction.save()
-                    transaction.book.save()
-                    return Response({"error": "Срок подтверждения истек, транзакция отменена"}, status=status.HTTP_400_BAD_REQUEST)
-                else:
-                    return Response({"error": refund.error}, status=status.HTTP_400_BAD_REQUEST)
-            except Exception as e:
-                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
-
-        transaction.status = 'SELLER_CONFIRMED'
-        transaction.buyer_confirmation_deadline = timezone.now() + timedelta(days=settings.BUYER_CONFIRMATION_DAYS)
-        transaction.save()
+            # The refund itself is issued by the background sweeper
+            schedule_expired_refunds()
+            return Response({"error": "Срок подтверждения истек, транзакция будет отменена, а средства возвращены покупателю"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Must not race the refund sweeper, which claims PAID rows past the deadline
+        now = timezone.now()
+        confirmed = transaction.transition(
+            'PAID', 'SELLER_CONFIRMED',
+            condition=Q(seller_confirmation_deadline__gte=now, refund_status=''),
+            buyer_confirmation_deadline=now + timedelta(days=settings.BUYER_CONFIRMATION_DAYS),
+        )
+        if not confirmed:
+            return Response({"error": "Статус транзакции уже изменился"}, status=status.HTTP_409_CONFLICT)
         return Response({"message": "Отправка подтверждена"}, status=status.HTTP_200_OK)
 
 class BuyerConfirmReceiptView(APIView):
@@ -340,26 +466,66 @@ class BuyerConfirmReceiptView(APIView):
         if transaction.status != 'SELLER_CONFIRMED':
             return Response({"error": "Продавец еще не подтвердил отправку"}, status=status.HTTP_400_BAD_REQUEST)
 
-        transaction.status = 'BUYER_CONFIRMED'
-        transaction.save()
-        # Auto-complete after buyer confirmation
-        transaction.status = 'COMPLETED'
-        transaction.save()
+        # Buyer confirmation completes the deal right away
+        if not transaction.transition('SELLER_CONFIRMED', 'COMPLETED'):
+            return Response({"error": "Статус транзакции уже изменился"}, status=status.HTTP_409_CONFLICT)
         return Response({"message": "Получение подтверждено, сделка завершена"}, status=status.HTTP_200_OK)
 
-class SellerTransactionsView(generics.ListAPIView):
+class TransactionHistoryView(generics.ListAPIView):
     serializer_class = TransactionSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = TransactionHistoryPagination
+    party_field = None
 
     def get_queryset(self):
-        return Transaction.objects.filter(seller=self.request.user).select_related('book', 'buyer', 'seller')
+        return Transaction.objects.filter(**{self.party_field: self.request.user}).select_related(
+            'book', 'buyer__avatar', 'seller__avatar'
+        )
 
-class BuyerTransactionsView(generics.ListAPIView):
-    serializer_class = TransactionSerializer
+    def list(self, request, *args, **kwargs):
+        try:
+            queryset = filter_transactions(self.get_queryset(), request.query_params)
+        except ValueError as error:
+            return Response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+        sort = request.query_params.get('sort', 'newest')
+        if sort not in TransactionHistoryPagination.orderings:
+            return Response({"error": "Неверная сортировка"}, status=status.HTTP_400_BAD_REQUEST)
+
+        count = queryset.count() if request.query_params.get('with_count') == 'true' else None
+        page = self.paginator.paginate_queryset(queryset, request, sort)
+        serializer = self.get_serializer(page, many=True)
+        return self.paginator.get_paginated_response(serializer.data, count=count)
+
+class SellerTransactionsView(TransactionHistoryView):
+    party_field = 'seller'
+
+class BuyerTransactionsView(TransactionHistoryView):
+    party_field = 'buyer'
+
+class SellerDashboardView(APIView):
     permission_classes = [IsAuthenticated]
 
-    def get_queryset(self):
-        return Transaction.objects.filter(buyer=self.request.user).select_related('book', 'buyer', 'seller')
+    def get(self, request):
+        date_from, date_to = default_period()
+        try:
+            if request.query_params.get('date_from'):
+                date_from = parse_date(request.query_params['date_from'])
+            if request.query_params.get('date_to'):
+                date_to = parse_date(request.query_params['date_to'])
+        except ValueError:
+            date_from = None
+        if date_from is None or date_to is None:
+            return Response({"error": "Неверный формат даты, ожидается ГГГГ-ММ-ДД"}, status=status.HTTP_400_BAD_REQUEST)
+        if date_from > date_to:
+            return Response({"error": "Начальная дата позже конечной"}, status=status.HTTP_400_BAD_REQUEST)
+        if (date_to - date_from).days >= settings.SELLER_DASHBOARD_MAX_DAYS:
+            return Response(
+                {"error": f"Период не может превышать {settings.SELLER_DASHBOARD_MAX_DAYS} дней"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        dashboard = seller_dashboard(request.user, date_from, date_to)
+        return Response(SellerDashboardSerializer(dashboard).data, status=status.HTTP_200_OK)
 
 class BuyerDisputeView(APIView):
     permission_classes = [IsAuthenticated]
@@ -376,14 +542,14 @@ class BuyerDisputeView(APIView):
         if transaction.status != 'SELLER_CONFIRMED':
             return Response({"error": "Продавец еще не подтвердил отправку"}, status=status.HTTP_400_BAD_REQUEST)
 
-        if timezone.now() > transaction.buyer_confirmation_deadline:
+        now = timezone.now()
+        if now > transaction.buyer_confirmation_deadline:
             # Auto-complete if deadline passed
-            transaction.status = 'COMPLETED'
-            transaction.save()
+            transaction.transition('SELLER_CONFIRMED', 'COMPLETED')
             return Response({"error": "Срок подтверждения истек, сделка завершена"}, status=status.HTTP_400_BAD_REQUEST)
 
-        transaction.status = 'DISPUTED'
-        transaction.save()
+        if not transaction.transition('SELLER_CONFIRMED', 'DISPUTED', condition=Q(buyer_confirmation_deadline__gte=now)):
+            return Response({"error": "Статус транзакции уже изменился"}, status=status.HTTP_409_CONFLICT)
         return Response({"message": "Суперечка открыта, ожидайте решения администратора"}, status=status.HTTP_200_OK)
     
 class FavoriteListCreateView(generics.ListCreateAPIView):
@@ -391,7 +557,7 @@ class FavoriteListCreateView(generics.ListCreateAPIView):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return Favorite.objects.filter(user=self.request.user)
+        return with_listing_relations(Favorite.objects.filter(user=self.request.user), prefix='book_listing__')
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('media', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='photo',
+            name='medium',
+            field=models.ImageField(blank=True, default='', upload_to='book_photos/variants/'),
+        ),
+        migrations.AddField(
+            model_name='photo',
+            name='thumbnail',
+            field=models.ImageField(blank=True, default='', upload_to='book_photos/variants/'),
+        ),
+    ]
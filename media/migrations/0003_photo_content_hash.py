@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('media', '0002_photo_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='photo',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, unique=True),
+        ),
+    ]
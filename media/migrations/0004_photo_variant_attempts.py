@@ -0,0 +1,22 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('media', '0003_photo_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='photo',
+            name='variant_attempts',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='photo',
+            index=models.Index(condition=models.Q(('thumbnail', '')), fields=['id'], name='photo_missing_variants_idx'),
+        ),
+    ]
@@ -4,7 +4,20 @@ from django.db import models
 
 class Photo(models.Model):
     image = models.ImageField(upload_to='book_photos/')
+    # Web-optimized copies, filled in by media.tasks.generate_photo_variants
+    thumbnail = models.ImageField(upload_to='book_photos/variants/', blank=True, default='')
+    medium = models.ImageField(upload_to='book_photos/variants/', blank=True, default='')
+    # Renders started for the variants; the sweep gives up after PHOTO_VARIANT_MAX_ATTEMPTS
+    variant_attempts = models.PositiveSmallIntegerField(default=0, editable=False)
+    # sha256 of the original bytes, identical uploads share one row and one file
+    content_hash = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False)
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Keeps the variants sweep from scanning photos that already have them
+            models.Index(fields=['id'], condition=models.Q(thumbnail=''), name='photo_missing_variants_idx'),
+        ]
+
     def __str__(self):
         return f"Photo {self.id}"
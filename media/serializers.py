@@ -0,0 +1,27 @@
+# media/serializers.py
+from rest_framework import serializers
+
+from .models import Photo
+
+
+def photo_url(file, request=None):
+    url = file.url
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
+
+
+class PhotoSerializer(serializers.ModelSerializer):
+    # Variants fall back to the original until they have been generated
+    thumbnail = serializers.SerializerMethodField()
+    medium = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Photo
+        fields = ['id', 'image', 'thumbnail', 'medium']
+
+    def get_thumbnail(self, obj):
+        return photo_url(obj.thumbnail or obj.image, self.context.get('request'))
+
+    def get_medium(self, obj):
+        return photo_url(obj.medium or obj.image, self.context.get('request'))
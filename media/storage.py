@@ -0,0 +1,87 @@
+# media/storage.py
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+
+from .models import Photo
+
+HASHED_PREFIX = 'book_photos/sha256/'
+
+
+def file_digest(file):
+    hasher = hashlib.sha256()
+    for chunk in file.chunks():
+        hasher.update(chunk)
+    file.seek(0)
+    return hasher.hexdigest()
+
+
+def hashed_name(digest, original_name):
+    extension = os.path.splitext(original_name or '')[1].lower() or '.jpg'
+    return f'{HASHED_PREFIX}{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+
+def write_blob(file, digest):
+    """Write the file under its content address unless it is already there."""
+    name = hashed_name(digest, file.name)
+    if not default_storage.exists(name):
+        name = default_storage.save(name, file)
+    return name
+
+
+def store_photo(file, digest=None):
+    """Return ``(photo, created)`` for the uploaded file, reusing identical uploads."""
+    digest = digest or file_digest(file)
+    existing = Photo.objects.filter(content_hash=digest).first()
+    if existing is not None:
+        return existing, False
+
+    name = write_blob(file, digest)
+    try:
+        with transaction.atomic():
+            return Photo.objects.create(image=name, content_hash=digest), True
+    except IntegrityError:
+        # Someone stored the same bytes in the meantime
+        return Photo.objects.get(content_hash=digest), False
+
+
+def store_photos(files, digests=None):
+    """Batch version of store_photo: returns ``(photos, created_ids)``.
+
+    Photos come back in the order of ``files``. New blobs are written
+    concurrently and the new rows are inserted with a single bulk insert.
+    """
+    if not digests or len(digests) != len(files):
+        digests = [file_digest(file) for file in files]
+
+    photos_by_digest = {photo.content_hash: photo for photo in Photo.objects.filter(content_hash__in=digests)}
+    pending = {}
+    for digest, file in zip(digests, files):
+        if digest not in photos_by_digest and digest not in pending:
+            pending[digest] = file
+
+    created_ids = set()
+    if pending:
+        with ThreadPoolExecutor(max_workers=settings.PHOTO_BATCH_WRITE_WORKERS) as pool:
+            names = list(pool.map(lambda item: write_blob(item[1], item[0]), pending.items()))
+        new_photos = [Photo(image=name, content_hash=digest) for name, digest in zip(names, pending)]
+        try:
+            with transaction.atomic():
+                Photo.objects.bulk_create(new_photos)
+        except IntegrityError:
+            # Lost a race on some of the hashes, fall back to one row at a time
+            new_photos = []
+            for digest in pending:
+                photo, created = store_photo(pending[digest], digest)
+                new_photos.append(photo)
+                if created:
+                    created_ids.add(photo.id)
+        else:
+            created_ids = {photo.id for photo in new_photos}
+        photos_by_digest.update({photo.content_hash: photo for photo in new_photos})
+
+    return [photos_by_digest[digest] for digest in digests], created_ids
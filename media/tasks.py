@@ -0,0 +1,80 @@
+# media/tasks.py
+import logging
+import os
+from io import BytesIO
+
+from celery import shared_task
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db.models import F
+from PIL import Image, ImageOps
+
+from .models import Photo
+
+logger = logging.getLogger(__name__)
+
+VARIANT_EXTENSIONS = {'WEBP': 'webp', 'AVIF': 'avif', 'JPEG': 'jpg'}
+
+
+def render_variant(image, size):
+    variant = image.copy()
+    variant.thumbnail(size, Image.LANCZOS)
+    buffer = BytesIO()
+    # No exif/icc arguments are passed, so the metadata of the upload is dropped
+    variant.save(buffer, settings.PHOTO_VARIANT_FORMAT, quality=settings.PHOTO_VARIANT_QUALITY)
+    return buffer.getvalue()
+
+
+@shared_task
+def generate_photo_variants(photo_id):
+    photo = Photo.objects.filter(id=photo_id).first()
+    # Duplicate queue entries find the variants already there
+    if photo is None or not photo.image or photo.thumbnail:
+        return
+    # Counted before rendering so a worker killed by a huge original still uses up an attempt
+    Photo.objects.filter(id=photo_id).update(variant_attempts=F('variant_attempts') + 1)
+    try:
+        render_photo_variants(photo)
+    except Exception:
+        logger.exception("Could not generate variants for photo %s", photo_id)
+
+
+def render_photo_variants(photo):
+    with photo.image.open('rb') as source:
+        image = Image.open(source)
+        # Apply the EXIF orientation before the tag is thrown away
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info or 'A' in image.getbands() else 'RGB')
+
+    stem = os.path.splitext(os.path.basename(photo.image.name))[0]
+    extension = VARIANT_EXTENSIONS.get(settings.PHOTO_VARIANT_FORMAT, settings.PHOTO_VARIANT_FORMAT.lower())
+    photo.thumbnail.save(
+        f'{stem}_thumb.{extension}', ContentFile(render_variant(image, settings.PHOTO_THUMBNAIL_SIZE)), save=False
+    )
+    photo.medium.save(
+        f'{stem}_medium.{extension}', ContentFile(render_variant(image, settings.PHOTO_MEDIUM_SIZE)), save=False
+    )
+    photo.save(update_fields=['thumbnail', 'medium'])
+
+
+@shared_task
+def generate_missing_photo_variants(limit=500):
+    # Queues one task per photo so a slow or broken original never holds up the sweep
+    photo_ids = list(
+        Photo.objects.filter(thumbnail='', variant_attempts__lt=settings.PHOTO_VARIANT_MAX_ATTEMPTS)
+        .order_by('id').values_list('id', flat=True)[:limit]
+    )
+    for photo_id in photo_ids:
+        schedule_photo_variants(photo_id)
+    return len(photo_ids)
+
+
+def schedule_photo_variants(photo_id):
+    # The periodic sweep picks the photo up later if the broker is unavailable,
+    # so give up on the first failed publish rather than retrying
+    try:
+        generate_photo_variants.apply_async((photo_id,), retry=False, ignore_result=True)
+    except Exception:
+        logger.warning("Could not queue variants for photo %s", photo_id, exc_info=True)
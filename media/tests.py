@@ -1,3 +1,99 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework.test import APIClient
+
+from users.models import CustomUser
+
+from .models import Photo
+from .storage import file_digest
+
+
+def image_file(name='photo.png', size=(20, 20), color=(200, 10, 10), image_format='PNG'):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, format=image_format)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type=f'image/{image_format.lower()}')
+
+
+class PhotoUploadLimitTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        storage = override_settings(MEDIA_ROOT=media_root)
+        storage.enable()
+        self.addCleanup(storage.disable)
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.create_user(
+            email='user@example.com', password=None, first_name='Test', last_name='User',
+        ))
+
+    def upload(self, file):
+        return self.client.post('/api/media/upload-photo/', {'file': file}, format='multipart')
+
+    def upload_batch(self, files):
+        return self.client.post('/api/media/upload-photos/', {'files': files}, format='multipart')
+
+    def test_accepts_image(self):
+        response = self.upload(image_file())
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Photo.objects.filter(id=response.data['id']).exists())
+
+    @override_settings(PHOTO_UPLOAD_MAX_BYTES=1024)
+    def test_request_over_size_limit(self):
+        response = self.upload(image_file(size=(200, 200), image_format='BMP'))
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(response.data, {'error': 'Файл слишком большой'})
+        self.assertFalse(Photo.objects.exists())
+
+    @override_settings(PHOTO_UPLOAD_MAX_BYTES=1024)
+    def test_file_over_size_limit_in_batch(self):
+        # The request fits the batch allowance, the single file does not
+        response = self.upload_batch([image_file(size=(150, 150), image_format='BMP')])
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(response.data, {'error': 'Файл слишком большой'})
+        self.assertFalse(Photo.objects.exists())
+
+    @override_settings(PHOTO_UPLOAD_MAX_PIXELS=30 * 30)
+    def test_image_over_pixel_limit(self):
+        response = self.upload(image_file(size=(40, 30)))
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(response.data, {'error': 'Изображение слишком большое'})
+        self.assertFalse(Photo.objects.exists())
+
+    def test_rejects_non_image(self):
+        response = self.upload(SimpleUploadedFile('photo.png', b'not an image ' * 100, content_type='image/png'))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {'error': 'Файл не является изображением'})
+        self.assertFalse(Photo.objects.exists())
+
+    def test_rejects_format_outside_allow_list(self):
+        response = self.upload(image_file('photo.bmp', image_format='BMP'))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {'error': 'Неподдерживаемый формат изображения'})
+
+    @override_settings(PHOTO_BATCH_MAX_FILES=2)
+    def test_batch_over_file_limit(self):
+        response = self.upload_batch([image_file(color=(0, 0, shade)) for shade in range(3)])
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(response.data, {'error': 'Слишком много файлов'})
+        self.assertFalse(Photo.objects.exists())
+
+    def test_batch_keeps_upload_order(self):
+        existing = self.upload(image_file(color=(0, 0, 2))).data['id']
+        files = [image_file(f'{shade}.png', color=(0, 0, shade)) for shade in (5, 2, 9, 5)]
+
+        response = self.upload_batch(files)
+
+        self.assertEqual(response.status_code, 201)
+        ids = response.data['ids']
+        hashes = dict(Photo.objects.values_list('id', 'content_hash'))
+        self.assertEqual([hashes[photo_id] for photo_id in ids], [file_digest(file) for file in files])
+        # Identical files map to one photo, wherever they appear
+        self.assertEqual(ids[1], existing)
+        self.assertEqual(ids[0], ids[3])
+        self.assertEqual(len(set(ids)), 3)
+        self.assertEqual([photo['id'] for photo in response.data['photos']], ids)
@@ -0,0 +1,100 @@
+# media/uploadhandlers.py
+import hashlib
+
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+from django.http import QueryDict
+from django.utils.datastructures import MultiValueDict
+from PIL import Image, ImageFile
+
+# Room for multipart boundaries and the other form fields
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class ImageUploadLimitHandler(FileUploadHandler):
+    """Checks photo uploads while they stream in and stops bad ones early.
+
+    Runs in front of Django's own handlers: it only looks at the chunks and
+    passes them on. Requests that are too large are refused before the body
+    is read, files that grow past the byte limit or whose header is not an
+    allowed image within the pixel limit abort the upload right away. The
+    reason is left on ``request.upload_rejection``.
+
+    The sha256 of every accepted file is collected on the way in and left on
+    ``request.upload_digests`` (field name -> list of hex digests).
+    """
+
+    def __init__(self, request=None, max_files=1):
+        super().__init__(request)
+        self.max_files = max_files
+        self.max_bytes = settings.PHOTO_UPLOAD_MAX_BYTES
+        self.max_pixels = settings.PHOTO_UPLOAD_MAX_PIXELS
+        self.header_bytes = settings.PHOTO_UPLOAD_HEADER_BYTES
+        self.allowed_formats = set(settings.PHOTO_UPLOAD_ALLOWED_FORMATS)
+        self.files_seen = 0
+        if request is not None:
+            request.upload_digests = {}
+
+    def reject(self, message, status_code=400):
+        if self.request is not None:
+            self.request.upload_rejection = (message, status_code)
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        if content_length > self.max_bytes * self.max_files + MULTIPART_OVERHEAD:
+            self.reject("Файл слишком большой", 413)
+            # Returning a result skips parsing, so the body is never read
+            return QueryDict(encoding=encoding), MultiValueDict()
+        return None
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.files_seen += 1
+        if self.files_seen > self.max_files:
+            self.reject("Слишком много файлов", 413)
+            raise StopUpload(connection_reset=True)
+        self.received = 0
+        self.hasher = hashlib.sha256()
+        self.parser = ImageFile.Parser()
+        self.image = None
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_bytes:
+            self.reject("Файл слишком большой", 413)
+            raise StopUpload(connection_reset=True)
+        if self.image is None:
+            self.check_header(raw_data)
+        self.hasher.update(raw_data)
+        return raw_data
+
+    def check_header(self, raw_data):
+        try:
+            self.parser.feed(raw_data)
+        except Image.DecompressionBombError:
+            self.reject("Изображение слишком большое", 413)
+            raise StopUpload(connection_reset=True)
+        except Exception:
+            self.reject("Файл не является изображением")
+            raise StopUpload(connection_reset=True)
+        image = self.parser.image
+        if image is None:
+            if self.received >= self.header_bytes:
+                self.reject("Файл не является изображением")
+                raise StopUpload(connection_reset=True)
+            return
+        self.image = image
+        if image.format not in self.allowed_formats:
+            self.reject("Неподдерживаемый формат изображения")
+            raise StopUpload(connection_reset=True)
+        width, height = image.size
+        if width * height > self.max_pixels:
+            self.reject("Изображение слишком большое", 413)
+            raise StopUpload(connection_reset=True)
+
+    def file_complete(self, file_size):
+        # Short files end before the header check could decide
+        if self.image is None:
+            self.reject("Файл не является изображением")
+        elif self.request is not None:
+            self.request.upload_digests.setdefault(self.field_name, []).append(self.hasher.hexdigest())
+        return None
@@ -1,7 +1,8 @@
 # media/urls.py
 from django.urls import path
-from .views import PhotoUploadView
+from .views import PhotoUploadView, PhotoBatchUploadView
 
 urlpatterns = [
     path('upload-photo/', PhotoUploadView.as_view(), name='upload_photo'),
+    path('upload-photos/', PhotoBatchUploadView.as_view(), name='upload_photos'),
 ]
@@ -2,14 +2,67 @@ from rest_framework.parsers import MultiPartParser, FormParser  # Добавля
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework import status
-from .models import Photo
+from django.db import transaction
+from django.conf import settings
+from django.views.static import serve
+from .storage import HASHED_PREFIX, store_photo, store_photos
+from .tasks import schedule_photo_variants
+from .uploadhandlers import ImageUploadLimitHandler
 
 class PhotoUploadView(APIView):
     parser_classes = (MultiPartParser, FormParser)  # Используем MultiPartParser и FormParser
+    max_files = 1
+
+    def initialize_request(self, request, *args, **kwargs):
+        # Has to be installed before anything reads the body
+        request.upload_handlers.insert(0, ImageUploadLimitHandler(request, max_files=self.get_max_files()))
+        return super().initialize_request(request, *args, **kwargs)
+
+    def get_max_files(self):
+        return self.max_files
 
     def post(self, request, *args, **kwargs):
         file = request.FILES.get('file')  # Ожидаем ключ 'file'
+        rejection = getattr(request, 'upload_rejection', None)
+        if rejection:
+            message, status_code = rejection
+            return Response({'error': message}, status=status_code)
         if file:
-            photo = Photo.objects.create(image=file)
+            digests = getattr(request, 'upload_digests', {}).get('file')
+            photo, created = store_photo(file, digests[0] if digests else None)
+            if not created:
+                return Response({'id': photo.id, 'image_path': photo.image.url}, status=status.HTTP_200_OK)
+            transaction.on_commit(lambda: schedule_photo_variants(photo.id))
             return Response({'id': photo.id, 'image_path': photo.image.url}, status=status.HTTP_201_CREATED)
-        return Response({'error': 'No file provided'}, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        return Response({'error': 'No file provided'}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class PhotoBatchUploadView(PhotoUploadView):
+    def get_max_files(self):
+        return settings.PHOTO_BATCH_MAX_FILES
+
+    def post(self, request, *args, **kwargs):
+        files = request.FILES.getlist('files')  # Ожидаем ключ 'files'
+        rejection = getattr(request, 'upload_rejection', None)
+        if rejection:
+            message, status_code = rejection
+            return Response({'error': message}, status=status_code)
+        if not files:
+            return Response({'error': 'No files provided'}, status=status.HTTP_400_BAD_REQUEST)
+
+        digests = getattr(request, 'upload_digests', {}).get('files')
+        photos, created_ids = store_photos(files, digests)
+        for photo_id in created_ids:
+            transaction.on_commit(lambda photo_id=photo_id: schedule_photo_variants(photo_id))
+        return Response({
+            'ids': [photo.id for photo in photos],
+            'photos': [{'id': photo.id, 'image_path': photo.image.url} for photo in photos],
+        }, status=status.HTTP_201_CREATED if created_ids else status.HTTP_200_OK)
+
+
+def serve_media(request, path, document_root=None, show_indexes=False):
+    # Content-addressed files never change, so clients may cache them forever
+    response = serve(request, path, document_root=document_root, show_indexes=show_indexes)
+    if path.startswith(HASHED_PREFIX):
+        response['Cache-Control'] = f'public, max-age={settings.PHOTO_IMMUTABLE_CACHE_SECONDS}, immutable'
+    return response
\ No newline at end of file
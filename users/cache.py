@@ -0,0 +1,90 @@
+# users/cache.py
+"""Users resolved for authenticated requests, cached in two tiers.
+
+A per-process dict answers most requests without any I/O; its entries live
+for ``USER_CACHE_LOCAL_SECONDS`` only, because other processes cannot clear
+them. Behind it the shared cache keeps users for ``USER_CACHE_SECONDS`` and
+is cleared whenever a user is saved, deleted or updated in bulk. That tier is
+only used with USER_CACHE_SHARED, i.e. when every process shares one cache;
+a per-process cache could not be cleared by the process that made a change.
+"""
+import copy
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import transaction
+
+_local = {}
+_local_lock = threading.Lock()
+
+
+def get_cache():
+    return caches[settings.USER_CACHE_ALIAS]
+
+
+def user_cache_key(user_id):
+    return f'users:auth:{user_id}'
+
+
+def _get_local(user_id):
+    with _local_lock:
+        entry = _local.get(user_id)
+        if entry is None:
+            return None
+        expires, user = entry
+        if expires < time.monotonic():
+            del _local[user_id]
+            return None
+    # Every request gets its own instance so changes to request.user stay local
+    return copy.copy(user)
+
+
+def _set_local(user_id, user):
+    with _local_lock:
+        if user_id not in _local and len(_local) >= settings.USER_CACHE_LOCAL_MAX_ENTRIES:
+            _local.pop(next(iter(_local)))
+        _local[user_id] = (time.monotonic() + settings.USER_CACHE_LOCAL_SECONDS, copy.copy(user))
+
+
+def get_user(user_id):
+    """Return the user with this primary key; raises DoesNotExist like ``objects.get``."""
+    # Tokens carry the id as a string; keys must match the ones invalidate_users() clears
+    user_id = str(user_id)
+    user = _get_local(user_id)
+    if user is not None:
+        return user
+    if settings.USER_CACHE_SHARED:
+        cache = get_cache()
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = get_user_model().objects.get(pk=user_id)
+            cache.set(key, user, settings.USER_CACHE_SECONDS)
+    else:
+        user = get_user_model().objects.get(pk=user_id)
+    _set_local(user_id, user)
+    return user
+
+
+def _invalidate(user_ids):
+    with _local_lock:
+        for user_id in user_ids:
+            _local.pop(user_id, None)
+    get_cache().delete_many([user_cache_key(user_id) for user_id in user_ids])
+
+
+def invalidate_users(user_ids):
+    user_ids = [str(user_id) for user_id in user_ids]
+    if not user_ids:
+        return
+    _invalidate(user_ids)
+    # A request that read the old row before the commit may have cached it again
+    transaction.on_commit(lambda: _invalidate(user_ids))
+
+
+def clear_local():
+    with _local_lock:
+        _local.clear()
@@ -0,0 +1,19 @@
+# users/hashers.py
+from django.conf import settings
+from django.contrib.auth.hashers import ScryptPasswordHasher
+
+
+class TunedScryptPasswordHasher(ScryptPasswordHasher):
+    """Scrypt with parameters from settings.
+
+    Django's defaults run five sequential lanes; a single lane over twice the
+    memory keeps an attacker's cost per guess up while a login verification
+    takes a fraction of the CPU time. Hashes keep the ``scrypt`` prefix, so
+    changing the parameters rehashes passwords on the next successful login.
+    """
+
+    work_factor = settings.PASSWORD_SCRYPT_WORK_FACTOR
+    block_size = settings.PASSWORD_SCRYPT_BLOCK_SIZE
+    parallelism = settings.PASSWORD_SCRYPT_PARALLELISM
+    # hashlib refuses anything above 32 MiB by default; allow the configured cost plus headroom
+    maxmem = 2 * 128 * work_factor * block_size * parallelism + 1024 * 1024
@@ -0,0 +1,71 @@
+import time
+
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, ScryptPasswordHasher
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory
+
+from users.hashers import TunedScryptPasswordHasher
+from users.models import CustomUser
+from users.views import LoginView
+
+BENCH_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'bench-login'}}
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Measure password hasher cost and LoginView throughput under a credential-stuffing burst"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--attempts', type=int, default=100)
+        parser.add_argument('--ips', type=int, default=2, help="Distinct client addresses of the attacker")
+        parser.add_argument('--emails', type=int, default=20, help="Distinct emails tried, half of them unknown")
+
+    def handle(self, *args, **options):
+        self.hasher_costs()
+        try:
+            with transaction.atomic(), override_settings(CACHES=BENCH_CACHES):
+                self.attack(options['attempts'], options['ips'], options['emails'])
+                # Never keep the generated users
+                raise Rollback
+        except Rollback:
+            pass
+
+    def hasher_costs(self):
+        for hasher in (PBKDF2PasswordHasher(), ScryptPasswordHasher(), TunedScryptPasswordHasher()):
+            encoded = hasher.encode('correct horse battery staple', hasher.salt())
+            started = time.perf_counter()
+            for _ in range(5):
+                hasher.verify('wrong password', encoded)
+            elapsed = (time.perf_counter() - started) / 5
+            self.stdout.write(f"{type(hasher).__name__:<28} {elapsed * 1000:8.2f} ms per verification")
+
+    def attack(self, attempts, ips, emails):
+        known = [f'bench-login-{i}@example.com' for i in range(emails // 2)]
+        for email in known:
+            CustomUser.objects.create_user(email=email, password='correct horse battery staple', first_name='Bench')
+        targets = known + [f'bench-unknown-{i}@example.com' for i in range(emails - len(known))]
+        factory = APIRequestFactory()
+        view = LoginView.as_view()
+
+        for label, enabled in (('no throttling', False), ('throttled', True)):
+            timings = {}
+            with override_settings(LOGIN_THROTTLE_ENABLED=enabled):
+                for i in range(attempts):
+                    request = factory.post(
+                        '/api/auth/login/', {'email': targets[i % len(targets)], 'password': f'guess-{i}'},
+                        format='json', REMOTE_ADDR=f'198.51.100.{i % ips + 1}',
+                    )
+                    started = time.perf_counter()
+                    code = view(request).status_code
+                    timings.setdefault(code, []).append(time.perf_counter() - started)
+            elapsed = sum(sum(values) for values in timings.values())
+            breakdown = ', '.join(
+                f"{code}: {len(values)} x {sum(values) / len(values) * 1000:.2f} ms"
+                for code, values in sorted(timings.items())
+            )
+            self.stdout.write(f"{label:<14} {attempts / elapsed:8.1f} attempts/s  ({breakdown})")
@@ -1,7 +1,26 @@
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.db import models
 
+# Fields the authentication checks read; bulk updates of them must clear cached users
+AUTH_CHECK_FIELDS = {'is_active', 'password'}
+
+
+class CustomUserQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        if not AUTH_CHECK_FIELDS.intersection(kwargs):
+            return super().update(**kwargs)
+        from .cache import invalidate_users
+
+        user_ids = list(self.values_list('pk', flat=True))
+        updated = super().update(**kwargs)
+        invalidate_users(user_ids)
+        return updated
+
+
 class CustomUserManager(BaseUserManager):
+    def get_queryset(self):
+        return CustomUserQuerySet(self.model, using=self._db)
+
     def create_user(self, email, password=None, **extra_fields):
         if not email:
             raise ValueError('The Email field must be set')
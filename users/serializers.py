@@ -2,14 +2,12 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from media.models import Photo
+from media.serializers import PhotoSerializer
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from .tokens import CachedBlacklistRefreshToken
 
 User = get_user_model()
 
-class PhotoSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Photo
-        fields = ['id', 'image']  # или другие поля, если есть
-
 class UserSerializer(serializers.ModelSerializer):
     avatar = PhotoSerializer(read_only=True)
     avatar_id = serializers.PrimaryKeyRelatedField(
@@ -36,4 +34,7 @@ class RegisterSerializer(serializers.ModelSerializer):
 
 class LoginSerializer(serializers.Serializer):
     email = serializers.EmailField()
-    password = serializers.CharField(write_only=True)
\ No newline at end of file
+    password = serializers.CharField(write_only=True)
+
+class CachedBlacklistTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = CachedBlacklistRefreshToken
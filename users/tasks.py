@@ -0,0 +1,46 @@
+# users/tasks.py
+import logging
+import time
+
+from celery import shared_task
+from django.conf import settings
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def prune_expired_tokens(batch_size=None, time_budget=None):
+    # Deletes expired refresh tokens, and their blacklist entries, in short chunks;
+    # an expired token fails verification on its own, so its rows are dead weight
+    batch_size = batch_size or settings.TOKEN_PRUNE_BATCH_SIZE
+    time_budget = time_budget or settings.TOKEN_PRUNE_TIME_BUDGET_SECONDS
+    started = time.monotonic()
+    now = timezone.now()
+    deleted = 0
+    batches = 0
+    drained = False
+
+    while time.monotonic() - started < time_budget:
+        # expires_at is not indexed, but every token gets the same lifetime, so
+        # the oldest ids are the expired ones and the scan stops early
+        ids = list(
+            OutstandingToken.objects.filter(expires_at__lte=now).order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            drained = True
+            break
+        BlacklistedToken.objects.filter(token_id__in=ids).delete()
+        deleted += OutstandingToken.objects.filter(id__in=ids).delete()[0]
+        batches += 1
+        if len(ids) < batch_size:
+            drained = True
+            break
+
+    duration = time.monotonic() - started
+    logger.info(
+        "prune_expired_tokens: deleted=%s batches=%s duration=%.3fs drained=%s",
+        deleted, batches, duration, drained,
+    )
+    return {'deleted': deleted, 'batches': batches, 'duration': round(duration, 3), 'drained': drained}
@@ -1,3 +1,155 @@
-from django.test import TestCase
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import cache as user_cache
+from . import tokens
+from .models import CustomUser
+from .tokens import CachedBlacklistRefreshToken
+from .views import LoginView
+
+
+class UserProfileUpdateTests(TestCase):
+    def setUp(self):
+        user_cache.clear_local()
+        self.addCleanup(user_cache.clear_local)
+        self.user = CustomUser.objects.create_user(
+            email='user@example.com', password=None, first_name='Old', last_name='Name', region='Kyiv',
+        )
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def test_patch_does_not_write_back_stale_cached_fields(self):
+        # Caches the user for the next request
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 200)
+        # A change the cache does not see, e.g. from another process
+        CustomUser.objects.filter(pk=self.user.pk).update(region='Lviv')
+
+        response = self.client.patch('/api/auth/profile/', {'first_name': 'New'}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.first_name, 'New')
+        self.assertEqual(self.user.region, 'Lviv')
+
+
+class CachedAuthenticationTests(TestCase):
+    def setUp(self):
+        user_cache.clear_local()
+        self.addCleanup(user_cache.clear_local)
+        self.addCleanup(user_cache.get_cache().clear)
+        self.user = CustomUser.objects.create_user(
+            email='user@example.com', password=None, first_name='Test', last_name='User',
+        )
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def test_deactivation_locks_user_out(self):
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 401)
+
+    @override_settings(USER_CACHE_SHARED=False)
+    def test_unshared_cache_is_not_trusted(self):
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 200)
+        CustomUser.objects.filter(pk=self.user.pk).update(is_active=False)
+        # What another process's own cache still holds once its short-lived copy expires
+        user_cache.get_cache().set(user_cache.user_cache_key(self.user.pk), self.user)
+        user_cache.clear_local()
+
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 401)
+
+
+@override_settings(LOGIN_THROTTLE_ENABLED=True, LOGIN_THROTTLE_IP_RATE=(3, 60), LOGIN_THROTTLE_EMAIL_RATE=(2, 60))
+class LoginThrottleTests(TestCase):
+    def setUp(self):
+        caches[settings.LOGIN_THROTTLE_CACHE_ALIAS].clear()
+        self.addCleanup(caches[settings.LOGIN_THROTTLE_CACHE_ALIAS].clear)
+        self.view = LoginView.as_view()
+        self.factory = APIRequestFactory()
+
+    def login(self, email, password='wrong'):
+        return self.view(self.factory.post('/api/auth/login/', {'email': email, 'password': password}, format='json'))
+
+    def test_failures_per_email_are_limited(self):
+        CustomUser.objects.create_user(email='user@example.com', password='secret', first_name='Test', last_name='User')
+        self.assertEqual(self.login('user@example.com', 'secret').status_code, 200)
+        self.assertEqual([self.login('user@example.com').status_code for _ in range(2)], [401, 401])
+
+        response = self.login('user@example.com', 'secret')
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+
+    def test_parallel_burst_stops_at_limit(self):
+        attempts = 10
+        barrier = threading.Barrier(attempts)
+
+        def slow_check(**credentials):
+            # Every attempt is in flight while the others are checked
+            time.sleep(0.2)
+            return None
+
+        with mock.patch('users.views.authenticate', side_effect=slow_check) as check, \
+                ThreadPoolExecutor(max_workers=attempts) as pool:
+            def attempt(i):
+                barrier.wait()
+                return self.login(f'user{i}@example.com').status_code
+            codes = list(pool.map(attempt, range(attempts)))
+
+        self.assertEqual(check.call_count, 3)
+        self.assertEqual(sorted(codes), [401] * 3 + [429] * (attempts - 3))
+
+
+class CachedBlacklistTests(TestCase):
+    def setUp(self):
+        tokens.get_cache().clear()
+        self.addCleanup(tokens.get_cache().clear)
+        self.user = CustomUser.objects.create_user(
+            email='user@example.com', password=None, first_name='Test', last_name='User',
+        )
+        self.refresh = CachedBlacklistRefreshToken.for_user(self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.refresh.access_token}')
+
+    def cache_verdict(self):
+        # Checking the token caches "not blacklisted"
+        CachedBlacklistRefreshToken(str(self.refresh))
+        key = tokens.blacklist_cache_key(self.refresh['jti'])
+        self.assertEqual(tokens.get_cache().get(key), tokens.NOT_BLACKLISTED)
+
+    def refresh_status(self):
+        return self.client.post('/api/auth/refresh/', {'refresh': str(self.refresh)}, format='json').status_code
+
+    def test_logout_overrides_cached_verdict(self):
+        for trusted in (True, False):
+            with self.subTest(trusted=trusted), override_settings(TOKEN_BLACKLIST_CACHE_TRUSTED=trusted):
+                self.refresh = CachedBlacklistRefreshToken.for_user(self.user)
+                self.cache_verdict()
+                response = self.client.post('/api/auth/logout/', {'refresh': str(self.refresh)}, format='json')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(self.refresh_status(), 401)
+
+    def blacklist_elsewhere(self):
+        # Like a process with its own cache: the database changes, this cache does not
+        BlacklistedToken.objects.create(token=OutstandingToken.objects.get(jti=self.refresh['jti']))
+
+    @override_settings(TOKEN_BLACKLIST_CACHE_TRUSTED=False)
+    def test_untrusted_cache_checks_database(self):
+        self.cache_verdict()
+        self.blacklist_elsewhere()
+        self.assertEqual(self.refresh_status(), 401)
+
+    @override_settings(TOKEN_BLACKLIST_CACHE_TRUSTED=True)
+    def test_trusted_cache_skips_database(self):
+        self.cache_verdict()
+        with self.assertNumQueries(0):
+            CachedBlacklistRefreshToken(str(self.refresh))
@@ -0,0 +1,121 @@
+# users/throttling.py
+"""Sliding-window limits on login attempts per client IP and per email.
+
+Limits are checked before the password is hashed, so a blocked attempt never
+pays for it. Each attempt is counted up front with an atomic increment and
+judged by the incremented value, so a burst of parallel attempts cannot all
+pass a check made before any of them was recorded. Blocked attempts are taken
+back out again, as are successful logins from the per-email count.
+
+Each window is approximated with two fixed-window counters: the previous
+window's count is weighted by how much of it still overlaps the sliding
+window. Counters live in the shared cache; if it is unreachable they fall
+back to a per-process LocMemCache so logins keep working.
+"""
+import hashlib
+import logging
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from rest_framework.throttling import BaseThrottle
+
+logger = logging.getLogger(__name__)
+
+_fallback = LocMemCache('login-throttle', {'OPTIONS': {'MAX_ENTRIES': 10000}})
+
+
+def _call(method, *args):
+    try:
+        return getattr(caches[settings.LOGIN_THROTTLE_CACHE_ALIAS], method)(*args)
+    except ValueError:
+        raise
+    except Exception:
+        logger.warning("Login throttle cache unavailable, using local memory", exc_info=True)
+        return getattr(_fallback, method)(*args)
+
+
+def _key(scope, ident, window, index):
+    digest = hashlib.sha1(ident.encode()).hexdigest()
+    return f'login-throttle:{scope}:{window}:{digest}:{index}'
+
+
+def _retry_after(current, previous, offset, limit, window):
+    """Seconds until the weighted count drops below ``limit`` if no attempts are made."""
+    if current >= limit:
+        # Wait for the next window, where ``current`` is the decaying previous count
+        wait = window - offset + window * (1 - limit / current)
+    else:
+        wait = window * (1 - (limit - current) / previous) - offset
+    return max(1, math.ceil(wait))
+
+
+def _hit(key, window):
+    """Count an attempt under ``key`` and return the new count."""
+    # Two windows: the counter is still read as the previous window
+    _call('add', key, 0, 2 * window)
+    try:
+        return _call('incr', key)
+    except ValueError:
+        # Expired between add() and incr()
+        _call('set', key, 1, 2 * window)
+        return 1
+
+
+def _undo(key):
+    try:
+        _call('decr', key)
+    except ValueError:
+        # Already expired
+        pass
+
+
+def client_ip(request):
+    # Honours REST_FRAMEWORK['NUM_PROXIES'] like the DRF throttles
+    return BaseThrottle().get_ident(request)
+
+
+def normalize_email(email):
+    return (email or '').strip().lower()
+
+
+def _scopes(request, email):
+    ip_limit, ip_window = settings.LOGIN_THROTTLE_IP_RATE
+    email_limit, email_window = settings.LOGIN_THROTTLE_EMAIL_RATE
+    return (
+        ('ip', client_ip(request), ip_limit, ip_window),
+        ('email', normalize_email(email), email_limit, email_window),
+    )
+
+
+def count_attempt(request, email):
+    """Count this login attempt; return ``(retry_after, counted)``.
+
+    ``retry_after`` is the seconds to wait if the attempt is over a limit, in
+    which case it is not counted, else None. Pass ``counted`` to
+    ``forgive_attempt()`` when the login succeeds.
+    """
+    counted = {}
+    if not settings.LOGIN_THROTTLE_ENABLED:
+        return None, counted
+    now = time.time()
+    for scope, ident, limit, window in _scopes(request, email):
+        index, offset = divmod(now, window)
+        key = _key(scope, ident, window, int(index))
+        counted[scope] = key
+        current = _hit(key, window)
+        previous = _call('get', _key(scope, ident, window, int(index) - 1)) or 0
+        if previous * (1 - offset / window) + current > limit:
+            for counted_key in counted.values():
+                _undo(counted_key)
+            # This attempt no longer counts, so it does not delay the retry
+            return _retry_after(current - 1, previous, offset, limit, window), {}
+    return None, counted
+
+
+def forgive_attempt(counted):
+    """Take a successful login out of the per-email count, which only limits failures."""
+    if 'email' in counted:
+        _undo(counted['email'])
@@ -0,0 +1,55 @@
+# users/tokens.py
+"""Refresh tokens whose blacklist checks are answered from the cache.
+
+Every refresh and logout checks the token's jti against BlacklistedToken.
+Blacklisting writes the verdict through to the cache under the jti until
+the token expires, so a cached "blacklisted" is always safe to act on. A
+cached "not blacklisted" can be outdated when another process blacklisted
+the token against a different cache, so it is only trusted with
+TOKEN_BLACKLIST_CACHE_TRUSTED, i.e. when every process shares one cache.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+BLACKLISTED = 1
+NOT_BLACKLISTED = 0
+
+
+def get_cache():
+    return caches[settings.TOKEN_BLACKLIST_CACHE_ALIAS]
+
+
+def blacklist_cache_key(jti):
+    return f'jwt:blacklist:{jti}'
+
+
+class CachedBlacklistRefreshToken(RefreshToken):
+    def cache_timeout(self):
+        # No need to remember a token past its expiry: it fails verification anyway
+        return max(1, int(self.payload['exp'] - time.time()))
+
+    def check_blacklist(self):
+        jti = self.payload[api_settings.JTI_CLAIM]
+        key = blacklist_cache_key(jti)
+        cached = get_cache().get(key)
+        if cached == BLACKLISTED:
+            raise TokenError(_("Token is blacklisted"))
+        if cached == NOT_BLACKLISTED and settings.TOKEN_BLACKLIST_CACHE_TRUSTED:
+            return
+        if BlacklistedToken.objects.filter(token__jti=jti).exists():
+            get_cache().set(key, BLACKLISTED, self.cache_timeout())
+            raise TokenError(_("Token is blacklisted"))
+        # add() so a concurrent blacklist() is never overwritten
+        get_cache().add(key, NOT_BLACKLISTED, self.cache_timeout())
+
+    def blacklist(self):
+        result = super().blacklist()
+        get_cache().set(blacklist_cache_key(self.payload[api_settings.JTI_CLAIM]), BLACKLISTED, self.cache_timeout())
+        return result
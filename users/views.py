@@ -2,9 +2,10 @@ from rest_framework import generics, status
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate, get_user_model
 from .serializers import RegisterSerializer, UserSerializer, LoginSerializer
+from .throttling import count_attempt, forgive_attempt
+from .tokens import CachedBlacklistRefreshToken
 
 User = get_user_model()
 
@@ -21,9 +22,19 @@ class LoginView(APIView):
     def post(self, request):
         serializer = LoginSerializer(data=request.data)
         if serializer.is_valid():
-            user = authenticate(email=serializer.validated_data['email'], password=serializer.validated_data['password'])
+            email = serializer.validated_data['email']
+            # Rejected before authenticate() so blocked attempts never pay for a password hash
+            retry_after, counted = count_attempt(request, email)
+            if retry_after is not None:
+                return Response(
+                    {'error': 'Too many login attempts, try again later'},
+                    status=status.HTTP_429_TOO_MANY_REQUESTS,
+                    headers={'Retry-After': str(retry_after)},
+                )
+            user = authenticate(email=email, password=serializer.validated_data['password'])
             if user:
-                refresh = RefreshToken.for_user(user)
+                forgive_attempt(counted)
+                refresh = CachedBlacklistRefreshToken.for_user(user)
                 return Response({
                     'refresh': str(refresh),
                     'access': str(refresh.access_token),
@@ -36,7 +47,7 @@ class LogoutView(APIView):
     def post(self, request):
         try:
             refresh_token = request.data["refresh"]
-            token = RefreshToken(refresh_token)
+            token = CachedBlacklistRefreshToken(refresh_token)
             token.blacklist()
             return Response(status=status.HTTP_200_OK)
         except Exception:
@@ -52,7 +63,9 @@ class UserProfileView(APIView):
         return Response(serializer.data, status=status.HTTP_200_OK)
     
     def patch(self, request):
-        serializer = UserSerializer(request.user, data=request.data, partial=True)
+        # request.user may come from the auth cache; save() writes every column, so start from the current row
+        user = User.objects.get(pk=request.user.pk)
+        serializer = UserSerializer(user, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data)